@@ -0,0 +1,92 @@
+"""
+分块器对比：校验原生分块器与 LangChain RecursiveCharacterTextSplitter 的输出一致，并比较耗时
+
+用法：python benchmarks/bench_chunker.py [--docs 300] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import ProcessingConfig
+from utils.text_splitter import DEFAULT_SEPARATORS, RecursiveTextSplitter
+
+try:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+except ImportError:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+WORDS = [
+    "Python", "is", "a", "language", "retrieval", "augmented", "generation", "model",
+    "人工智能", "是", "计算机", "科学", "的", "一个", "分支", "检索", "增强", "生成",
+    "。", "！", "？", ".", "!", "?", "\n", "\n\n", " ",
+]
+
+
+def make_corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        # 一半是短摘要，一半是整页长度的文本
+        length = rng.randint(20, 80) if i % 2 else rng.randint(500, 3000)
+        docs.append("".join(rng.choice(WORDS) + rng.choice(["", " "]) for _ in range(length)))
+    return docs
+
+
+def check_parity(docs, sizes):
+    mismatches = 0
+    for chunk_size, overlap in sizes:
+        native = RecursiveTextSplitter(chunk_size, overlap, DEFAULT_SEPARATORS)
+        langchain = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=overlap, length_function=len, separators=DEFAULT_SEPARATORS
+        )
+        for doc in docs:
+            if native.split_text(doc) != langchain.split_text(doc):
+                mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_corpus(args.docs)
+    size, overlap = ProcessingConfig.CHUNK_SIZE, ProcessingConfig.CHUNK_OVERLAP
+    native = RecursiveTextSplitter(size, overlap, DEFAULT_SEPARATORS)
+    langchain = RecursiveCharacterTextSplitter(
+        chunk_size=size, chunk_overlap=overlap, length_function=len, separators=DEFAULT_SEPARATORS
+    )
+
+    mismatches = check_parity(docs, [(size, overlap), (50, 10), (30, 0), (200, 50)])
+    print(f"parity: {mismatches} mismatching documents")
+
+    max_chunks = ProcessingConfig.MAX_CHUNKS_PER_DOC
+
+    def run_langchain():
+        for doc in docs:
+            langchain.split_text(doc)[:max_chunks]
+
+    def run_native():
+        for doc in docs:
+            native.split_text(doc)
+
+    def run_native_capped():
+        for doc in docs:
+            for i, _ in enumerate(native.iter_spans(doc), 1):
+                if i >= max_chunks:
+                    break
+
+    for name, fn in [("langchain", run_langchain), ("native", run_native), ("native (capped)", run_native_capped)]:
+        best = min(timeit.repeat(fn, repeat=args.repeat, number=1))
+        print(f"{name:<18} {best / len(docs) * 1e6:10.1f} us/doc")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
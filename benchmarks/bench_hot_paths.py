@@ -0,0 +1,206 @@
+"""
+CPU 热点微基准：TextCleaner.clean、ChunkManager.split_and_merge、DocumentProcessor.process_documents、
+DocumentProcessor.rerank_chunks，使用中英文混合的摘要和整页语料，在不同批大小下记录 CPU 时间和内存分配，
+结果保存为 JSON，并可与基线比较判断是否退化
+
+用法：python benchmarks/bench_hot_paths.py [--batch-sizes 1,10,50] [--output hot_paths.json]
+      python benchmarks/bench_hot_paths.py --baseline hot_paths.json [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import FakeCrossEncoder, git_revision
+from core.document_processor import DocumentProcessor
+from models.query import SearchResult
+from utils.chunk_manager import ChunkManager
+from utils.text_cleaner import TextCleaner
+
+ZH_SENTENCES = [
+    "检索增强生成先从搜索引擎召回文档，再由大模型基于文档生成回答。",
+    "向量检索使用近似最近邻索引，在召回率和延迟之间取得平衡。",
+    "大语言模型的首个 token 延迟主要取决于提示长度和模型是否已经加载。",
+    "分块大小和重叠长度会影响重排序的候选数量和回答质量！",
+    "缓存命中率越高，搜索阶段的尾延迟越低？",
+]
+EN_SENTENCES = [
+    "Python's asyncio event loop schedules coroutines and callbacks on a single thread.",
+    "Cross-encoders score each query and passage pair jointly, which is accurate but expensive.",
+    "HTTP keep-alive lets clients reuse TCP connections across requests.",
+    "Jan 15, 2025 — The latest release adds support for async generators & faster startup.",
+    "Prometheus histograms expose cumulative buckets that can be aggregated across instances.",
+]
+QUERY = "如何降低 RAG 检索增强生成的首 token 延迟 latency"
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(rng.choice(ZH_SENTENCES + EN_SENTENCES) for _ in range(sentences))
+
+
+def make_snippets(count: int, seed: int = 11):
+    """搜索摘要：1~3 句，部分带简单的 HTML 标记"""
+    rng = random.Random(seed)
+    snippets = []
+    for i in range(count):
+        text = _paragraph(rng, rng.randint(1, 3))
+        snippets.append(f"<b>{text}</b> &amp; more" if i % 4 == 0 else text)
+    return snippets
+
+
+def make_pages(count: int, seed: int = 13):
+    """整页 HTML：带 script/style 的 20~60 段正文"""
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        body = "".join(f"<p>{_paragraph(rng, rng.randint(2, 6))}</p>" for _ in range(rng.randint(20, 60)))
+        pages.append(
+            "<html><head><title>Demo</title><style>p{margin:0}</style>"
+            "<script>var tracking = 1;</script></head><body><nav>Home | Docs</nav>"
+            f"{body}</body></html>"
+        )
+    return pages
+
+
+def as_results(texts):
+    return [
+        SearchResult(title=f"result {i}", content=text, url=f"https://example.com/{i}")
+        for i, text in enumerate(texts)
+    ]
+
+
+def measure(fn, items: int, min_time: float):
+    """
+    重复执行 fn 直到累计 CPU 时间超过 min_time，返回每项的 CPU/墙钟耗时，
+    再单独执行一次统计 tracemalloc 的分配峰值和分配总量
+    """
+    fn()  # 预热
+    runs = 0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        cpu = time.process_time() - cpu_start
+        if cpu >= min_time and runs >= 3:
+            break
+    wall = time.perf_counter() - wall_start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+
+    return {
+        'runs': runs,
+        'cpu_us_per_item': round(cpu / runs / items * 1e6, 2),
+        'wall_us_per_item': round(wall / runs / items * 1e6, 2),
+        'alloc_peak_kb': round(peak / 1024, 1),
+        'alloc_retained_kb': round(allocated / 1024, 1),
+    }
+
+
+def run(batch_sizes, min_time: float, real_reranker: bool):
+    processor = DocumentProcessor()
+    # 关闭重排序缓存，否则重复执行时全部命中缓存
+    processor.reranker.cache = None
+    if not real_reranker:
+        processor.reranker._model = FakeCrossEncoder()
+    chunk_manager = ChunkManager()
+
+    corpora = {'snippets': make_snippets(max(batch_sizes)), 'pages': make_pages(max(batch_sizes))}
+    results = {}
+    for corpus, texts in corpora.items():
+        for size in batch_sizes:
+            batch = texts[:size]
+            cleaned = [TextCleaner.clean(text) for text in batch]
+            search_results = as_results(batch)
+            documents = processor.process_documents(search_results, QUERY)
+            chunk_count = sum(len(doc.chunks) for doc in documents)
+
+            cases = {
+                'clean': (lambda: [TextCleaner.clean(text) for text in batch], size),
+                'split_and_merge': (lambda: [chunk_manager.split_and_merge(text) for text in cleaned], size),
+                'process_documents': (lambda: processor.process_documents(search_results, QUERY), size),
+                'rerank_chunks': (lambda: processor.rerank_chunks(QUERY, documents), max(1, chunk_count)),
+            }
+            for name, (fn, items) in cases.items():
+                key = f"{name}/{corpus}/batch={size}"
+                results[key] = measure(fn, items, min_time)
+                results[key]['items'] = items
+                print(f"{key:<40} {results[key]['cpu_us_per_item']:10.1f} us/item  "
+                      f"peak {results[key]['alloc_peak_kb']:8.1f} KB", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold: float):
+    """CPU 时间超过基线 (1 + threshold) 倍的用例视为退化"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get('results', {}).get(key)
+        if not base or not base.get('cpu_us_per_item'):
+            continue
+        ratio = current['cpu_us_per_item'] / base['cpu_us_per_item']
+        current['baseline_ratio'] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append({'case': key, 'baseline_us': base['cpu_us_per_item'],
+                                'current_us': current['cpu_us_per_item'], 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", default="1,10,50", help="逗号分隔的批大小（文档数）")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个用例至少累计的 CPU 时间（秒）")
+    parser.add_argument("--real-reranker", action="store_true", help="使用真实的交叉编码器（默认使用替身模型）")
+    parser.add_argument("--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--baseline", help="基线结果 JSON，用于判断是否退化")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的 CPU 时间增幅，默认 20%%")
+    args = parser.parse_args()
+
+    batch_sizes = [int(n) for n in args.batch_sizes.split(",") if n.strip()]
+    results = run(batch_sizes, args.min_time, args.real_reranker)
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'settings': {'batch_sizes': batch_sizes, 'min_time': args.min_time, 'real_reranker': args.real_reranker},
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        report['baseline_commit'] = baseline.get('commit')
+        report['threshold'] = args.threshold
+        report['regressions'] = regressions
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"结果已保存到 {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if regressions:
+        for item in regressions:
+            print(f"REGRESSION {item['case']}: {item['baseline_us']} -> {item['current_us']} us/item "
+                  f"({item['ratio']:.2f}x)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
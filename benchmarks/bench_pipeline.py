@@ -0,0 +1,232 @@
+"""
+端到端基准：用本地替身服务（benchmarks/stub_servers.py）运行 RAGSearch.process_query_stream，
+报告各阶段与端到端的 p50/p95/p99、不同并发下的吞吐量和峰值 RSS，结果以 JSON 输出并记录 git commit，
+便于在不同提交之间比较
+
+用法：python benchmarks/bench_pipeline.py [--concurrency 1,4,16] [--requests 40] [--fake-reranker] [--output result.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.settings import OllamaConfig
+from utils.metrics import MetricsRegistry
+from utils.retriever import tokenize
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "queries.txt")
+
+
+class RecordingMetrics(MetricsRegistry):
+    """在汇总直方图之外保留每个请求的原始阶段耗时，用于计算分位数"""
+
+    def __init__(self):
+        super().__init__()
+        self.traces = []
+        self._traces_lock = threading.Lock()
+
+    def observe_trace(self, trace):
+        super().observe_trace(trace)
+        with self._traces_lock:
+            self.traces.append([(span['name'], span['seconds']) for span in trace.spans])
+
+    def take(self):
+        with self._traces_lock:
+            traces, self.traces = self.traces, []
+        return traces
+
+
+class FakeCrossEncoder:
+    """按查询词重合度打分的替身模型，用于排除交叉编码器推理耗时"""
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        scores = []
+        for query, text in pairs:
+            terms = set(tokenize(query))
+            tokens = tokenize(text)
+            scores.append(sum(1 for token in tokens if token in terms) / (len(tokens) + 1))
+        return scores
+
+
+def percentile(values, pct):
+    """最近秩法分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+        'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+        'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else None,
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, text=True).strip())
+        return commit, dirty
+    except Exception:
+        return None, None
+
+
+def peak_rss_mb():
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def start_stubs(args):
+    """在独立进程中启动替身服务，避免与被测进程争用 GIL"""
+    proc = subprocess.Popen(
+        [
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_servers.py"),
+            "--search-latency-ms", str(args.search_latency_ms),
+            "--results", str(args.results),
+            "--token-rate", str(args.token_rate),
+            "--tokens", str(args.tokens),
+        ],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    ports = json.loads(proc.stdout.readline())
+    return proc, f"http://127.0.0.1:{ports['search_port']}", f"http://127.0.0.1:{ports['ollama_port']}"
+
+
+def run_query(rag_search, query, model):
+    """执行一个请求，返回 (端到端耗时, 首 token 耗时, 是否出错)"""
+    start = time.perf_counter()
+    ttft = None
+    error = False
+    for event in rag_search.process_query_stream(query, llm_type="ollama", model_name=model):
+        if 'error' in event:
+            error = True
+        elif ttft is None and isinstance(event.get('content'), str) and event['content']:
+            ttft = time.perf_counter() - start
+    return time.perf_counter() - start, ttft, error
+
+
+def run_level(rag_search, queries, concurrency, total, model):
+    """以 concurrency 个客户端并发执行 total 个请求"""
+    jobs = [queries[i % len(queries)] for i in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda q: run_query(rag_search, q, model), jobs))
+    wall = time.perf_counter() - start
+
+    stages = {}
+    for spans in rag_search.metrics.take():
+        for name, seconds in spans:
+            stages.setdefault(name, []).append(seconds)
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': sum(1 for _, _, error in outcomes if error),
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(total / wall, 3),
+        'end_to_end': summarize([e2e for e2e, _, _ in outcomes]),
+        'client_ttft': summarize([ttft for _, ttft, _ in outcomes if ttft is not None]),
+        'stages': {name: summarize(values) for name, values in sorted(stages.items())},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,4,16", help="逗号分隔的并发客户端数")
+    parser.add_argument("--requests", type=int, default=40, help="每个并发级别的请求数（至少等于并发数）")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="查询语料，每行一个查询")
+    parser.add_argument("--model", default="bench:stub")
+    parser.add_argument("--results", type=int, default=10, help="替身 SearXNG 每个查询返回的结果数")
+    parser.add_argument("--search-latency-ms", type=float, default=50.0)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="替身 Ollama 每秒输出的 token 数")
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--fake-reranker", action="store_true", help="用词重合度替代交叉编码器，排除模型推理耗时")
+    parser.add_argument("--keep-caches", action="store_true", help="保留搜索/改写/重排序/回答缓存（默认关闭以便比较）")
+    parser.add_argument("--output", help="结果 JSON 的保存路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    queries = [line.strip() for line in open(args.queries, encoding="utf-8") if line.strip()]
+    levels = [int(n) for n in args.concurrency.split(",") if n.strip()]
+    stubs, search_url, ollama_url = start_stubs(args)
+    try:
+        OllamaConfig.BASE_URL = ollama_url
+        # 冷启动耗时包含导入 main 和构造 RAGSearch
+        init_start = time.perf_counter()
+        from main import RAGSearch
+        rag_search = RAGSearch()
+        init_seconds = time.perf_counter() - init_start
+        logging.getLogger().setLevel(logging.WARNING)
+
+        rag_search.search_engine.base_url = search_url
+        rag_search.metrics = RecordingMetrics()
+        if not args.keep_caches:
+            rag_search.search_engine.cache = None
+            rag_search.query_processor.rewrite_cache = None
+            rag_search.document_processor.reranker.cache = None
+            rag_search.answer_cache = None
+        if args.fake_reranker:
+            rag_search.document_processor.reranker._model = FakeCrossEncoder()
+        else:
+            rag_search.document_processor.reranker.load()
+
+        # 预热一个请求，不计入结果
+        run_query(rag_search, queries[0], args.model)
+        rag_search.metrics.take()
+
+        results = [
+            run_level(rag_search, queries, concurrency, max(args.requests, concurrency), args.model)
+            for concurrency in levels
+        ]
+    finally:
+        stubs.terminate()
+        stubs.wait()
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'queries': len(queries),
+            'results_per_search': args.results,
+            'search_latency_ms': args.search_latency_ms,
+            'token_rate': args.token_rate,
+            'tokens': args.tokens,
+            'fake_reranker': args.fake_reranker,
+            'caches': args.keep_caches,
+        },
+        'init_seconds': round(init_seconds, 3),
+        'levels': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"结果已保存到 {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
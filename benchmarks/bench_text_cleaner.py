@@ -0,0 +1,64 @@
+"""
+TextCleaner 微基准：对比原始 BeautifulSoup 实现与当前实现
+
+用法：python benchmarks/bench_text_cleaner.py [--repeat 5] [--number 200]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from utils.text_cleaner import TextCleaner
+
+
+def legacy_clean(text: str) -> str:
+    """原始实现：每次都构建 BeautifulSoup 并使用未编译的正则"""
+    text = BeautifulSoup(text, "html.parser").get_text()
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'[^\w\s.,!?-]', '', text)
+    return text
+
+
+SNIPPETS = [
+    "Python is a high-level, general-purpose programming language. Its design philosophy emphasizes code readability.",
+    "人工智能（AI）是计算机科学的一个分支，它企图了解智能的实质，并生产出一种新的能以人类智能相似的方式做出反应的智能机器。",
+    "Jan 15, 2025 — The <b>latest</b> release adds support for async generators &amp; faster startup.",
+    "大语言模型的推理速度受显存带宽影响。 常见的优化手段包括量化、KV cache 复用以及批处理。",
+]
+PAGE = (
+    "<html><head><title>Demo</title><style>body{color:red}</style><script>var a=1;</script></head><body>"
+    + "".join(f"<p>{s}</p>" for s in SNIPPETS * 25)
+    + "</body></html>"
+)
+
+
+def bench(name, batch_fn, texts, repeat, number):
+    best = min(timeit.repeat(lambda: batch_fn(texts), repeat=repeat, number=number))
+    per_item_us = best / number / len(texts) * 1e6
+    print(f"{name:<28} {per_item_us:10.1f} us/text")
+    return per_item_us
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    for label, texts, number in [
+        ("snippets", SNIPPETS, args.number),
+        ("full page", [PAGE], max(1, args.number // 20)),
+    ]:
+        print(f"\n[{label}]")
+        old = bench("legacy (BeautifulSoup)", lambda ts: [legacy_clean(t) for t in ts], texts, args.repeat, number)
+        new = bench("TextCleaner.clean", lambda ts: [TextCleaner.clean(t) for t in ts], texts, args.repeat, number)
+        bench("TextCleaner.clean_batch", TextCleaner.clean_batch, texts, args.repeat, number)
+        print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
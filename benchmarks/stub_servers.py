@@ -0,0 +1,156 @@
+"""
+基准测试用的本地替身服务：
+- SearXNG：/search?format=json，按查询确定性地生成结果，可设置响应延迟
+- Ollama：/api/generate 按固定速率流式输出 token，另提供 /api/tags 和 /api/version
+
+用法：python benchmarks/stub_servers.py [--search-port 8888] [--ollama-port 11434] [--token-rate 50]
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SENTENCES = [
+    "Python's asyncio event loop schedules coroutines and callbacks on a single thread.",
+    "检索增强生成先从搜索引擎召回文档，再由大模型基于文档生成回答。",
+    "Cross-encoders score each query and passage pair jointly, which is accurate but expensive.",
+    "向量检索使用近似最近邻索引，在召回率和延迟之间取得平衡。",
+    "HTTP keep-alive lets clients reuse TCP connections across requests.",
+    "大语言模型的首个 token 延迟主要取决于提示长度和模型是否已经加载。",
+    "Prometheus histograms expose cumulative buckets that can be aggregated across instances.",
+    "分块大小和重叠长度会影响重排序的候选数量和回答质量。",
+]
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def make_results(query: str, count: int):
+    """按查询生成确定性的搜索结果：摘要长度不一，部分带 HTML 标记"""
+    seed = _seed(query)
+    results = []
+    for i in range(count):
+        n = 2 + (seed + i * 7) % 10
+        parts = [SENTENCES[(seed + i + j) % len(SENTENCES)] for j in range(n)]
+        content = " ".join(parts)
+        if i % 3 == 0:
+            content = "<p>" + "</p><p>".join(parts) + "</p>"
+        results.append({
+            'title': f"{query} - result {i}",
+            'url': f"https://example.com/{seed % 1000}/{i}",
+            'content': content
+        })
+    return results
+
+
+class SearxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    results = 10
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/search":
+            self.send_error(404)
+            return
+        query = parse_qs(url.query).get('q', [''])[0]
+        time.sleep(self.latency)
+        body = json.dumps({'results': make_results(query, self.results)}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_rate = 50.0
+    tokens = 64
+    load_delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({'models': [{'name': 'llama3:8b'}, {'name': 'bench:stub'}]})
+        elif self.path == "/api/version":
+            self._send_json({'version': 'stub'})
+        else:
+            self.send_error(404)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.load_delay)
+        prompt = request.get('prompt', '')
+        if not request.get('stream'):
+            # 查询改写/扩展走非流式接口，返回两行候选查询
+            head = prompt.strip().splitlines()[-1][:40] if prompt.strip() else "query"
+            self._send_json({'response': f"{head} overview\n{head} examples", 'done': True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+        for i in range(self.tokens):
+            time.sleep(interval)
+            self._write_chunk(json.dumps({'response': f"tok{i} ", 'done': False}).encode("utf-8") + b"\n")
+        self._write_chunk(json.dumps({'response': '', 'done': True}).encode("utf-8") + b"\n")
+        self._write_chunk(b"")
+
+
+def start_server(handler, port: int = 0, **attrs) -> ThreadingHTTPServer:
+    """在后台线程启动服务，attrs 覆盖处理器的类属性（延迟、token 速率等）"""
+    handler = type(handler.__name__, (handler,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--search-port", type=int, default=0)
+    parser.add_argument("--ollama-port", type=int, default=0)
+    parser.add_argument("--search-latency-ms", type=float, default=50.0)
+    parser.add_argument("--results", type=int, default=10)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="每秒输出的 token 数")
+    parser.add_argument("--tokens", type=int, default=64, help="每个回答的 token 数")
+    args = parser.parse_args()
+
+    searx = start_server(SearxHandler, args.search_port, latency=args.search_latency_ms / 1000, results=args.results)
+    ollama = start_server(OllamaHandler, args.ollama_port, token_rate=args.token_rate, tokens=args.tokens)
+    # 第一行输出端口，供 bench_pipeline.py 读取
+    print(json.dumps({'search_port': searx.server_port, 'ollama_port': ollama.server_port}), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,45 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
 @dataclass
 class SearchConfig:
     SEARX_BASE_URL: str = "http://127.0.0.1:4008"
     ENGINES: List[str] = field(default_factory=lambda: ["google", "bing", "duckduckgo","baidu"])
     MAX_RESULTS_PER_QUERY: int = 5
+    MAX_CONCURRENT_SEARCHES: int = 5  # 单个请求同时进行的最大搜索数
+    SEARCH_WORKERS: int = 64  # 所有请求共享的搜索线程数，按 并发请求数 × MAX_CONCURRENT_SEARCHES 估算
+    SEARCH_DEADLINE: float = 12.0  # 整个搜索阶段的截止时间（秒），各搜索的超时由剩余时间得到且不重试
+    # HTTP 连接池
+    POOL_CONNECTIONS: int = 10  # 缓存的主机连接池数量
+    POOL_MAXSIZE: int = 64  # 每个主机的最大连接数，与 SEARCH_WORKERS 一致以便复用连接
+    CONNECT_TIMEOUT: float = 3.0  # 连接超时（秒）
+    READ_TIMEOUT: float = 10.0  # 读取超时（秒）
+    MAX_RETRIES: int = 2  # 最大重试次数，只用于没有截止时间的单个搜索
+    RETRY_BACKOFF: float = 0.3  # 重试退避因子（秒）
+    # 搜索结果缓存
+    CACHE_ENABLED: bool = True
+    CACHE_TTL: int = 600  # 缓存过期时间（秒）
+    CACHE_MAX_ENTRIES: int = 1000
+    CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 内存缓存上限（字节）
+    CACHE_DB_PATH: Optional[str] = None  # sqlite 持久化缓存路径，None 表示仅使用内存缓存
 
 class OllamaConfig:
     
     BASE_URL = "http://127.0.0.1:11434"
     DEFAULT_MODEL = "llama3:8b"  # 或其他默认模型
-    TIMEOUT = 30  # 请求超时时间（秒）
+    TIMEOUT = 30  # 请求超时时间（秒），流式生成时为两次读取之间的最长等待
+    CONNECT_TIMEOUT = 3  # 连接超时（秒）
+    POOL_CONNECTIONS = 4  # 缓存的主机连接池数量
+    POOL_MAXSIZE = 16  # 每个主机的最大连接数
+    MAX_RETRIES = 2  # 最大重试次数
+    RETRY_BACKOFF = 0.5  # 重试退避因子（秒）
+    KEEP_ALIVE = "30m"  # 生成后模型在显存中保留的时间，-1 表示常驻
+    NUM_CTX = None  # 上下文长度，None 时使用模型默认值
+    NUM_THREAD = None  # 推理线程数，None 时由 Ollama 决定
+    NUM_PREDICT = None  # 最大生成 token 数，None 时不限制
+    PRELOAD_DEFAULT_MODEL = True  # 预热时预先加载 DEFAULT_MODEL
+    PRELOAD_TIMEOUT = 120  # 预加载模型的超时时间（秒），大模型从磁盘加载较慢
+    MODELS_CACHE_TTL = 300  # 模型列表缓存时间（秒），过期后先返回旧列表并在后台刷新
 
 @dataclass
 class ProcessingConfig:
@@ -19,16 +47,65 @@ class ProcessingConfig:
     CHUNK_OVERLAP: int = 20
     MIN_CHUNK_LENGTH: int = 50
     MAX_CHUNKS_PER_DOC: int = 10
+    CHUNKER: str = "native"  # "native"（utils/text_splitter.py）或 "langchain"
+    PREFER_QUERY_TERM_CHUNKS: bool = False  # 优先保留命中查询词的块，而不是文档开头的块
+    CHUNK_SCAN_FACTOR: int = 3  # 开启上一项时最多扫描 MAX_CHUNKS_PER_DOC * 该值 个候选块
     SEMANTIC_REWRITE_LIMIT: int = 1
     SEMANTIC_EXPANSION_LIMIT: int = 1
+    # 查询改写缓存
+    REWRITE_CACHE_ENABLED: bool = True
+    REWRITE_CACHE_SIZE: int = 2000
+    REWRITE_CACHE_TTL: int = 24 * 3600  # 缓存过期时间（秒）
+    REWRITE_WORKERS: int = 32  # 所有请求共享的语义扩展线程数，应不小于预期的并发请求数
+    REWRITE_PROMPT_VERSION: str = "v1"  # 修改改写/扩展提示词时需要同步更新，使旧缓存失效
+    STREAM_PROGRESS_EVENTS: bool = True  # 流式接口输出各阶段的进度与耗时事件
+    # 文档处理并行度
+    PROCESSING_WORKERS: int = 0  # 0 表示串行处理
+    PROCESSING_EXECUTOR: str = "thread"  # "thread" 或 "process"
+    PROCESSING_CHUNKSIZE: int = 4  # 进程池模式下每次分发给工作进程的文档数
+    BATCH_WORKERS: int = 32  # 所有请求共享的批次线程数，每个搜索返回后在其中抓取页面并处理文档
+    # 去重：按规范化 URL / 内容指纹去掉重复结果，按 SimHash 去掉近似重复块
+    DEDUP_ENABLED: bool = True
+    SIMHASH_MAX_DISTANCE: int = 6  # 汉明距离不超过该值视为近似重复
+    # 粗排：交叉编码器之前把候选块裁剪到 PREFILTER_TOP_N 个
+    PREFILTER_ENABLED: bool = True
+    PREFILTER_METHOD: str = "bm25"  # "bm25"、"embedding" 或 "hybrid"
+    PREFILTER_TOP_N: int = 30
+    # 查询路由：在调用 LLM 改写之前判断是否需要改写/扩展/检索
+    QUERY_ROUTING_ENABLED: bool = True
+    ROUTE_ALLOW_DIRECT_ANSWER: bool = True  # 寒暄、算术等输入不检索直接回答
+    ROUTE_NO_REWRITE_MAX_TERMS: int = 6  # 不超过该词数的关键词查询不做改写
+    ROUTE_EXPAND_MIN_TERMS: int = 20  # 达到该词数的查询做完整扩展
 @dataclass
 class ModelConfig:
     RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_BATCH_SIZE: int = 32  # 每批推理的样本数
+    RERANKER_MAX_LENGTH: int = 256  # 输入最大 token 长度
+    RERANKER_DEVICE: Optional[str] = None  # None 表示自动选择设备
+    RERANKER_NUM_THREADS: Optional[int] = None  # CPU 推理线程数，None 表示使用 torch 默认值
+    RERANK_CACHE_SIZE: int = 10000  # (query, chunk) 分数缓存条目数，0 表示不缓存
+    RERANK_MICRO_BATCHING: bool = True  # 合并并发请求的重排序推理
+    RERANK_BATCH_WINDOW_MS: float = 5.0  # 微批等待窗口（毫秒）
+    RERANK_MAX_BATCH_PAIRS: int = 256  # 单个微批最多合并的样本数
     EMBEDDING_MODEL: str = "sentence-transformers/all-mpnet-base-v2"
     QUERY_REWRITE_MODEL: str = "facebook/bart-large"
     LLM_TEMPERATURE: float = 0.7
     TOP_K_RESULTS: int = 5
     LLM_MAX_TOKENS = 1000
+    CONTEXT_TOKEN_BUDGET: int = 1500  # 参考文档在提示中最多占用的 token 数
+    CONTEXT_MIN_OVERLAP: int = 10  # 没有偏移量时，判定两个块首尾重叠的最少字符数
+    CONTEXT_MIN_SCORE: Optional[float] = None  # 低于该重排序分数的块不放入提示，None 表示不过滤
+    # 统计上下文 token 数的分词器：Hugging Face 名称或本地目录，应与 OllamaConfig.DEFAULT_MODEL 对应；
+    # None 或加载失败时按字符估算
+    CONTEXT_TOKENIZER: Optional[str] = "NousResearch/Meta-Llama-3-8B-Instruct"
+    CONTEXT_TOKENIZER_LOCAL_ONLY: bool = False  # 只从本地缓存加载分词器，不访问网络
+    PROMPT_VERSION: str = "v2"  # 修改提示词模板时递增，使旧的缓存回答失效
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1000  # 内存中缓存的回答数
+    ANSWER_CACHE_TTL: int = 3600  # 回答缓存过期时间（秒）
+    ANSWER_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 回答缓存的内存上限
+    ANSWER_CACHE_DB_PATH: Optional[str] = None  # sqlite 持久化层路径，None 表示仅使用内存缓存
+    ANSWER_REPLAY_RATE: float = 0.0  # 命中时每秒回放的内容事件数，0 表示立即回放
     
     # 模型类型
     MODEL_TYPE_GPT4 = 'gpt4'
@@ -40,4 +117,35 @@ class ModelConfig:
 @dataclass
 class LogConfig:
     LOG_LEVEL: str = "INFO"
-    LOG_FILE: str = "rag_search.log" 
\ No newline at end of file
+    LOG_FILE: str = "rag_search.log"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # 单个日志文件的最大字节数，超出后轮转
+    LOG_BACKUP_COUNT: int = 5  # 保留的历史日志文件数
+    TRACE_LOGGING: bool = True  # 每个请求结束时输出一行 JSON 格式的阶段追踪日志
+
+@dataclass
+class FetchConfig:
+    ENABLED: bool = False  # 是否抓取搜索结果的完整页面，关闭时只使用搜索摘要
+    MAX_WORKERS: int = 8  # 并发下载线程数
+    PER_HOST_LIMIT: int = 2  # 同一主机的最大并发下载数
+    MAX_BYTES: int = 512 * 1024  # 单个页面最多读取的字节数，超出部分丢弃
+    CONNECT_TIMEOUT: float = 3.0  # 连接超时（秒）
+    READ_TIMEOUT: float = 4.0  # 读取超时（秒），实际使用时不超过距截止时间的剩余时间
+    DEADLINE: float = 4.0  # 整个抓取阶段的截止时间（秒），超时的页面回退为摘要
+    ALLOWED_CONTENT_TYPES: List[str] = field(
+        default_factory=lambda: ["text/html", "text/plain", "application/xhtml+xml"]
+    )
+    USER_AGENT: str = "Mozilla/5.0 (compatible; rag-ai-search)"
+    # 页面内容缓存：存储清理后的文本（分块依赖查询词，不缓存），过期后用 ETag/Last-Modified 条件请求重新验证
+    PAGE_CACHE_ENABLED: bool = True
+    PAGE_CACHE_PATH: str = "page_cache.sqlite3"
+    PAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    PAGE_CACHE_TTL: int = 3600  # 在该时间内直接使用缓存，不发起请求（秒）
+
+@dataclass
+class ServerConfig:
+    # ASGI 服务模式（web/asgi_app.py）
+    HOST: str = "0.0.0.0"
+    PORT: int = 5000
+    EXECUTOR_WORKERS: int = 8  # 执行重排序等同步阶段的线程数
+    MAX_CONNECTIONS: int = 200  # 异步 HTTP 客户端的最大连接数
+    MAX_KEEPALIVE_CONNECTIONS: int = 50  # 异步 HTTP 客户端保持的空闲连接数
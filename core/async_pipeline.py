@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncGenerator, Dict, Optional
+
+from config.settings import FetchConfig, OllamaConfig, ProcessingConfig, SearchConfig, ServerConfig
+from models.query import Query
+from utils.deduplicator import SeenResults
+from utils.metrics import GenerationTracker, RequestTrace, record_fetch, record_processing
+from utils.query_router import ROUTE_DIRECT
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRAGSearch:
+    """
+    RAGSearch 的异步版本，供 ASGI 服务使用：改写、搜索和 LLM 流式输出走异步 HTTP，
+    页面抓取和文档处理在 RAGSearch 的批次线程池中执行，重排序等其余同步阶段放到本类的线程池中执行，
+    事件格式与 process_query_stream 一致
+    """
+
+    def __init__(self, rag_search, executor_workers: Optional[int] = None):
+        """
+        Args:
+            rag_search: RAGSearch 实例，复用其中的查询处理、搜索、文档处理组件及其缓存
+            executor_workers: 同步阶段的线程数，默认 ServerConfig.EXECUTOR_WORKERS
+        """
+        self.rag_search = rag_search
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_workers or ServerConfig.EXECUTOR_WORKERS,
+            thread_name_prefix="async-pipeline"
+        )
+        self._http_client = None
+
+    @property
+    def http_client(self):
+        """所有请求共享的 httpx.AsyncClient，首次使用时在当前事件循环中创建"""
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=ServerConfig.MAX_CONNECTIONS,
+                    max_keepalive_connections=ServerConfig.MAX_KEEPALIVE_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(OllamaConfig.TIMEOUT, connect=OllamaConfig.CONNECT_TIMEOUT)
+            )
+        return self._http_client
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self.executor.shutdown(wait=False)
+
+    async def _run(self, fn, *args, **kwargs):
+        """在线程池中执行同步阶段"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def _timed_search(self, query: str, deadline_at: float):
+        start = time.perf_counter()
+        results = await self.rag_search.search_engine.search_async(query, self.http_client, deadline_at)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Search '{query}' returned {len(results)} results in {elapsed * 1000:.0f} ms")
+        return query, results, elapsed
+
+    async def process_query_stream(
+        self,
+        user_query: str,
+        llm_type: str = "ollama",
+        model_name: str = "llama2"
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        异步流式处理用户查询，参数与产出的事件同 RAGSearch.process_query_stream
+        """
+        trace = RequestTrace(user_query, self.rag_search.metrics)
+        error = None
+        try:
+            start_time = trace.started_at
+
+            def progress(stage: str, **info) -> Dict:
+                info['stage'] = stage
+                info['elapsed_ms'] = round((time.perf_counter() - start_time) * 1000, 1)
+                return {'progress': info}
+
+            emit_progress = ProcessingConfig.STREAM_PROGRESS_EVENTS
+
+            # 查询改写
+            use_gpt4 = "gpt" in llm_type.lower()
+            with trace.span('rewrite') as sizes:
+                # 改写使用异步 LLM 客户端，在事件循环中等待，不占用线程
+                query = await self.rag_search.query_processor.rewrite_query_async(
+                    Query(original_text=user_query),
+                    use_gpt4=use_gpt4,
+                    model_name=model_name,
+                    http_client=self.http_client
+                )
+                sizes['queries'] = len(query.rewritten_queries)
+            logger.info(f"查询路由: {query.route}, 改写后的查询: {query.rewritten_queries}")
+            if emit_progress:
+                yield progress('rewrite', route=query.route, queries=query.rewritten_queries)
+
+            if query.route == ROUTE_DIRECT:
+                ranked_chunks = []
+            else:
+                # 每个搜索返回后立即在批次线程池中抓取和处理，各批次相互重叠；
+                # as_completed 的截止时间只约束搜索，抓取截止时间从检索开始计算，所有批次共享
+                documents = []
+                result_count = 0
+                seen = SeenResults()
+                fetch_deadline_at = time.monotonic() + FetchConfig.DEADLINE
+                # 与同步版本一致：整个搜索阶段共用一个截止时间，各搜索的超时由剩余时间得到
+                search_deadline_at = time.perf_counter() + SearchConfig.SEARCH_DEADLINE
+                tasks = [
+                    asyncio.ensure_future(self._timed_search(q, search_deadline_at))
+                    for q in dict.fromkeys(query.rewritten_queries)
+                ]
+                batches = []
+                fetch_windows = []
+                try:
+                    try:
+                        for next_done in asyncio.as_completed(tasks, timeout=SearchConfig.SEARCH_DEADLINE):
+                            q, results, elapsed = await next_done
+                            result_count += len(results)
+                            trace.record('search', elapsed, results=len(results))
+                            if emit_progress:
+                                yield progress('search', query=q, results=len(results), search_ms=round(elapsed * 1000, 1))
+                            batches.append((q, asyncio.wrap_future(self.rag_search.batch_executor.submit(
+                                self.rag_search.process_batch, results, query.original_text, seen, fetch_deadline_at
+                            ))))
+                    except asyncio.TimeoutError:
+                        logger.warning(f"Searches missed the {SearchConfig.SEARCH_DEADLINE:.1f}s deadline")
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+
+                    # 按搜索返回的顺序收集各批次的文档
+                    for q, future in batches:
+                        batch, fetch_window = await future
+                        if fetch_window is not None:
+                            fetch_windows.append(fetch_window)
+                        documents.extend(batch)
+                        if emit_progress:
+                            yield progress(
+                                'process',
+                                query=q,
+                                documents=len(batch),
+                                chunks=sum(len(doc.chunks) for doc in batch)
+                            )
+                finally:
+                    for _, future in batches:
+                        future.cancel()
+                # 抓取、清理和分块按请求汇总，每个阶段只记录一次
+                record_fetch(trace, fetch_windows, result_count)
+                record_processing(trace, documents)
+
+                # 重排序
+                with trace.span('rerank', candidates=sum(len(doc.chunks) for doc in documents)) as sizes:
+                    ranked_chunks = await self._run(
+                        self.rag_search.document_processor.rerank_chunks,
+                        query.original_text,
+                        documents
+                    )
+                    sizes['chunks'] = len(ranked_chunks)
+                if emit_progress:
+                    yield progress('rerank', chunks=len(ranked_chunks))
+
+            # 每个请求使用自己的 LLMHandler，不修改共享状态
+            llm_handler = self.rag_search.client_registry.get_handler(llm_type, model_name)
+            generation = GenerationTracker(trace, llm_handler)
+            answer_cache = self.rag_search.answer_cache
+            cache_key = None
+            cached = None
+            if answer_cache is not None:
+                cache_key = answer_cache.key(query.original_text, llm_type, model_name, ranked_chunks)
+                with trace.span('answer_cache') as sizes:
+                    cached = answer_cache.get(cache_key)
+                    sizes['hit'] = int(cached is not None)
+            if cached is not None:
+                logger.info("回答缓存命中")
+                responses = answer_cache.areplay(llm_handler.sources_event(ranked_chunks), cached)
+            else:
+                responses = llm_handler.generate_response_stream_async(
+                    query.original_text,
+                    ranked_chunks,
+                    http_client=self.http_client
+                )
+                if cache_key is not None:
+                    responses = answer_cache.arecord(cache_key, responses)
+            async for response in responses:
+                if generation.observe(response) and emit_progress:
+                    yield progress('first_token')
+                if 'error' in response:
+                    error = response['error']
+                yield response
+            generation.finish()
+            if emit_progress:
+                yield progress('done')
+
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Error processing query: {str(e)}")
+            yield {"error": f"处理查询时发生错误: {str(e)}"}
+        finally:
+            trace.finish(error)
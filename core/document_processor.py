@@ -1,49 +1,153 @@
-from typing import List
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Iterator, List, Optional, Sequence
 from models.document import Document, Chunk
 from utils.text_cleaner import TextCleaner
 from utils.chunk_manager import ChunkManager
-from sentence_transformers import CrossEncoder
+from utils.rerank_service import RerankService
+from utils.retriever import Prefilter, tokenize
+from utils.deduplicator import Deduplicator, SeenResults
 from config.settings import ModelConfig, ProcessingConfig
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 进程池模式下每个工作进程各自持有的清理器和分块器
+_worker_text_cleaner = None
+_worker_chunk_manager = None
+
+
+def _process_result_in_worker(result, query_terms: Optional[Sequence[str]] = None) -> Optional[Document]:
+    """进程池入口，必须是模块级函数才能被序列化"""
+    global _worker_text_cleaner, _worker_chunk_manager
+    if _worker_text_cleaner is None:
+        _worker_text_cleaner = TextCleaner()
+        _worker_chunk_manager = ChunkManager()
+    return _process_result(result, _worker_text_cleaner, _worker_chunk_manager, query_terms)
+
+
+def _process_result(
+    result,
+    text_cleaner: TextCleaner,
+    chunk_manager: ChunkManager,
+    query_terms: Optional[Sequence[str]] = None
+) -> Optional[Document]:
+    """
+    清理单个搜索结果并分块，出错时返回 None，不影响其他文档
+    """
+    try:
+        timings = {'clean': 0.0, 'chunk': 0.0}
+        if result.clean_seconds is not None:
+            # 页面抓取阶段已清理（或命中页面缓存），记录抓取线程中的清理耗时
+            clean_text = result.content
+            timings['clean'] = result.clean_seconds
+        else:
+            # 清理文本
+            start = time.perf_counter()
+            clean_text = text_cleaner.clean(result.content)
+            timings['clean'] = time.perf_counter() - start
+        
+        # 惰性分块，达到 MAX_CHUNKS_PER_DOC 即停止，偏移量记录在 metadata 中；
+        # 分块依赖本次请求的查询词，抓取的页面同样在这里分块
+        start = time.perf_counter()
+        chunks = list(chunk_manager.iter_split_and_merge(clean_text, query_terms))
+        timings['chunk'] = time.perf_counter() - start
+        
+        # 创建文档对象，为每个chunk添加文档信息
+        return Document(
+            chunks=[Chunk(
+                text=chunk,
+                metadata={'start': start, 'end': end},
+                source_url=result.url,
+                title=result.title
+            ) for chunk, start, end in chunks],
+            source_url=result.url,
+            title=result.title,
+            timings=timings
+        )
+        
+    except Exception as e:
+        logger.error(f"Error processing document: {str(e)}")
+        return None
+
+
 class DocumentProcessor:
     def __init__(self):
         self.text_cleaner = TextCleaner()
         self.chunk_manager = ChunkManager()
-        self.reranker = CrossEncoder(ModelConfig.RERANKER_MODEL)
+        self.reranker = RerankService()
+        self.prefilter = Prefilter() if ProcessingConfig.PREFILTER_ENABLED else None
+        self.deduplicator = Deduplicator() if ProcessingConfig.DEDUP_ENABLED else None
+        self.executor = self._create_executor()
+
+    def _create_executor(self):
+        """根据配置创建文档处理的线程池或进程池，PROCESSING_WORKERS 为 0 时串行处理"""
+        workers = ProcessingConfig.PROCESSING_WORKERS
+        if workers <= 0:
+            return None
+        if ProcessingConfig.PROCESSING_EXECUTOR == "process":
+            # 使用 spawn 避免在已加载 torch 的进程中 fork
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="doc-process")
         
-    def process_documents(self, search_results: List[dict]) -> List[Document]:
+    @staticmethod
+    def _query_terms(query: Optional[str]) -> Optional[List[str]]:
+        """提取用于分块选择的查询词：英文单词与中文二元组"""
+        if not query or not ProcessingConfig.PREFER_QUERY_TERM_CHUNKS:
+            return None
+        return sorted({term for term in tokenize(query) if len(term) > 1}) or None
+
+    def iter_documents(
+        self,
+        search_results: List[dict],
+        query: Optional[str] = None,
+        seen: Optional[SeenResults] = None
+    ) -> Iterator[Document]:
+        """
+        逐个产出处理好的文档，保持搜索结果的顺序，处理失败的结果会被跳过
+
+        Args:
+            search_results: 搜索结果列表
+            query: 原始查询，开启 PREFER_QUERY_TERM_CHUNKS 时用于优先保留命中查询词的块
+            seen: 跨批次的去重状态，分批处理搜索结果时传入同一个对象
+        """
+        # 多个改写查询经常返回相同的页面，先去重再清理分块
+        if self.deduplicator is not None:
+            search_results = self.deduplicator.dedup_results(search_results, seen)
+
+        query_terms = self._query_terms(query)
+        if self.executor is None or len(search_results) <= 1:
+            results = (
+                _process_result(result, self.text_cleaner, self.chunk_manager, query_terms)
+                for result in search_results
+            )
+        elif isinstance(self.executor, ProcessPoolExecutor):
+            results = self.executor.map(
+                partial(_process_result_in_worker, query_terms=query_terms),
+                search_results,
+                chunksize=ProcessingConfig.PROCESSING_CHUNKSIZE
+            )
+        else:
+            results = self.executor.map(
+                lambda result: _process_result(result, self.text_cleaner, self.chunk_manager, query_terms),
+                search_results
+            )
+
+        # map 保持输入顺序，失败的文档为 None
+        for doc in results:
+            if doc is not None:
+                yield doc
+        
+    def process_documents(self, search_results: List[dict], query: Optional[str] = None) -> List[Document]:
         """
         处理搜索结果，清理文本并创建文档块
         """
-        documents = []
-        for result in search_results:
-            try:
-                # 清理文本
-                clean_text = self.text_cleaner.clean(result.content)
-                
-                # 使用 Langchain 进行分块
-                chunks = self.chunk_manager.split_and_merge(clean_text)
-                
-                # 创建文档对象，为每个chunk添加文档信息
-                doc = Document(
-                    chunks=[Chunk(
-                        text=chunk,
-                        source_url=result.url,
-                        title=result.title
-                    ) for chunk in chunks],
-                    source_url=result.url,
-                    title=result.title
-                )
-                documents.append(doc)
-                
-            except Exception as e:
-                logger.error(f"Error processing document: {str(e)}")
-                continue
-                
-        return documents
+        return list(self.iter_documents(search_results, query))
     
     def rerank_chunks(self, query: str, documents: List[Document]) -> List[Chunk]:
         """
@@ -56,12 +160,20 @@ class DocumentProcessor:
             for doc in documents:
                 all_chunks.extend(doc.chunks)
                 
+            if self.deduplicator is not None:
+                all_chunks = self.deduplicator.dedup_chunks(all_chunks)
+
             if not all_chunks:
                 return []
+
+            # 粗排：只把前 N 个候选交给交叉编码器
+            if self.prefilter is not None and len(all_chunks) > self.prefilter.top_n:
+                keep = self.prefilter.select(query, [chunk.text for chunk in all_chunks])
+                logger.info(f"Prefilter kept {len(keep)} of {len(all_chunks)} chunks")
+                all_chunks = [all_chunks[i] for i in keep]
                 
             # 准备重排序的输入
-            pairs = [[query, chunk.text] for chunk in all_chunks]
-            scores = self.reranker.predict(pairs)
+            scores = self.reranker.score(query, [chunk.text for chunk in all_chunks])
                         
             # 更新块的分数
             for chunk, score in zip(all_chunks, scores):
@@ -1,29 +1,54 @@
-from typing import List, Dict, Generator, Optional
+from typing import AsyncGenerator, List, Dict, Generator, Optional
 from models.response import Response
 from models.document import Chunk
 from utils.gpt4_client import GPT4Client
+from utils.context_builder import ContextBuilder, count_tokens
 from config.settings import ModelConfig
 import logging
+import textwrap
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = textwrap.dedent("""\
+    你是一个专业的问答助手。请基于提供的文档内容，生成准确、连贯且有见地的回答。
+    如果文档内容不足以完全回答问题，请明确指出。回答应该：
+    1. 保持客观准确
+    2. 引用相关文档内容
+    3. 结构清晰
+    4. 易于理解""")
+
+USER_PROMPT = textwrap.dedent("""\
+    问题：{query}
+
+    参考文档：
+    {context}
+
+    请基于以上文档回答问题，必须采用跟问题相同的语种输出。""")
+
 class LLMHandler:
-    def __init__(self, llm_type: str = "gpt", model_name: Optional[str] = None):
+    def __init__(self, llm_type: str = "gpt", model_name: Optional[str] = None, client=None):
         """
         初始化 LLMHandler
         
         Args:
             llm_type: 选择使用的客户端类型，可选值："gpt" 或 "ollama"
             model_name: Ollama 模型名称，仅在 client_type 为 "ollama" 时需要
+            client: 复用的客户端实例（见 utils/client_registry.py），None 时新建
         """
         self.llm_type = llm_type
+        self.context_builder = ContextBuilder()
+        # 最近一次构建的提示长度（字符和 token），用于请求追踪
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
         if llm_type == "gpt":
-            self.client = GPT4Client()
+            self.client = client or GPT4Client()
         elif llm_type != "gpt":
             if not model_name:
                 raise ValueError("model_name is required when using ollama client")
-            from utils.ollama_client import OllamaClient
-            self.client = OllamaClient()
+            if client is None:
+                from utils.ollama_client import OllamaClient
+                client = OllamaClient()
+            self.client = client
             self.model_name = model_name
         else:
             raise ValueError(f"Unsupported client type: {llm_type}")
@@ -40,36 +65,7 @@ class LLMHandler:
             Response 对象，包含答案、支持文本块和置信度
         """
         try:
-            # 准备上下文
-            context = "\n".join([
-                f"文档{i+1}：{chunk.text}" 
-                for i, chunk in enumerate(relevant_chunks)
-            ])
-            
-            # 构建提示
-            messages = [
-                {
-                    "role": "system",
-                    "content": """你是一个专业的问答助手。请基于提供的文档内容，生成准确、连贯且有见地的回答。
-                    如果文档内容不足以完全回答问题，请明确指出。回答应该：
-                    1. 保持客观准确
-                    2. 引用相关文档内容
-                    3. 结构清晰
-                    4. 易于理解
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                    问题：{query}
-                    
-                    参考文档：
-                    {context}
-                    
-                    请基于以上文档回答问题，必须采用跟问题相同的语种输出。
-                    """
-                }
-            ]
+            messages = self._build_messages(query, relevant_chunks)
                         
             # 根据客户端类型调用不同的生成方法
             if self.llm_type == "gpt":
@@ -107,6 +103,19 @@ class LLMHandler:
                 confidence_score=0.0
             ) 
 
+    @staticmethod
+    def sources_event(relevant_chunks: List[Chunk]) -> Dict:
+        """流式回答的第一个事件：参考文档的来源信息"""
+        return {
+            "sources": [
+                {
+                    "url": chunk.source_url,
+                    "title": chunk.title,
+                    "score": float(chunk.score) if chunk.score is not None else None
+                } for chunk in relevant_chunks
+            ]
+        }
+
     def generate_response_stream(self, query: str, relevant_chunks: List[Chunk]) -> Generator[Dict, None, None]:
         """
         使用 GPT-4 生成流式回答
@@ -120,46 +129,9 @@ class LLMHandler:
         """
         try:
             # 首先返回源文档信息
-            yield {
-                "sources": [
-                    {
-                        "url": chunk.source_url,
-                        "title": chunk.title,
-                        "score": float(chunk.score) if chunk.score is not None else None
-                    } for chunk in relevant_chunks
-                ]
-            }
+            yield self.sources_event(relevant_chunks)
             
-            # 准备上下文
-            context = "\n".join([
-                f"文档{i+1}：{chunk.text}" 
-                for i, chunk in enumerate(relevant_chunks)
-            ])
-            
-            # 构建提示
-            messages = [
-                {
-                    "role": "system",
-                    "content": """你是一个专业的问答助手。请基于提供的文档内容，生成准确、连贯且有见地的回答。
-                    如果文档内容不足以完全回答问题，请明确指出。回答应该：
-                    1. 保持客观准确
-                    2. 引用相关文档内容
-                    3. 结构清晰
-                    4. 易于理解
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                    问题：{query}
-                    
-                    参考文档：
-                    {context}
-                    
-                    请基于以上文档回答问题，必须采用跟问题相同的语种输出。
-                    """
-                }
-            ]
+            messages = self._build_messages(query, relevant_chunks)
                         
             # 根据客户端类型调用不同的流式生成方法
             if self.llm_type == "gpt":
@@ -180,6 +152,74 @@ class LLMHandler:
             logger.error(f"Error generating response: {str(e)}")
             yield {"error": str(e)} 
 
+    async def generate_response_stream_async(
+        self,
+        query: str,
+        relevant_chunks: List[Chunk],
+        http_client=None
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        异步流式生成回答，事件格式与 generate_response_stream 一致
+        
+        Args:
+            query: 用户查询
+            relevant_chunks: 相关的文本块列表
+            http_client: httpx.AsyncClient，Ollama 客户端需要
+        """
+        try:
+            yield self.sources_event(relevant_chunks)
+            
+            messages = self._build_messages(query, relevant_chunks)
+            
+            if self.llm_type == "gpt":
+                async for content in self.client.get_completion_stream_async(
+                    messages=messages,
+                    temperature=ModelConfig.LLM_TEMPERATURE,
+                    max_tokens=1000
+                ):
+                    yield {"content": content}
+            else:  # ollama
+                async for response in self.client.generate_stream_async(
+                    prompt=self._format_messages_for_ollama(messages),
+                    model=self.model_name,
+                    client=http_client
+                ):
+                    yield response
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            yield {"error": str(e)}
+
+    def _build_messages(self, query: str, relevant_chunks: List[Chunk]) -> List[Dict[str, str]]:
+        """
+        构建对话消息，没有参考文档时（如直接回答路由）只发送问题本身；
+        参考文档经 ContextBuilder 合并、去冗余并控制在 token 预算内
+        """
+        if not relevant_chunks:
+            messages = [{"role": "user", "content": query}]
+        else:
+            packed = self.context_builder.build(relevant_chunks)
+            logger.info(
+                f"Packed {len(relevant_chunks)} chunks into {len(packed.chunks)} "
+                f"({packed.merged} merged, {packed.dropped} dropped), {packed.tokens} context tokens"
+            )
+
+            # 准备上下文，文档编号与 sources 事件中的顺序一致，合并的块列出所有覆盖的编号
+            context = "\n".join([
+                f"文档{'、'.join(str(i + 1) for i in chunk.metadata['source_indices'])}：{chunk.text}"
+                for chunk in packed.chunks
+            ])
+
+            # 构建提示
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": USER_PROMPT.format(query=query, context=context)}
+            ]
+
+        self.prompt_chars = sum(len(message["content"]) for message in messages)
+        self.prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        return messages
+
     def _format_messages_for_ollama(self, messages: List[Dict[str, str]]) -> str:
         """
         将 GPT 格式的消息列表转换为 Ollama 可用的提示文本
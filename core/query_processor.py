@@ -1,28 +1,43 @@
-from typing import List
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from models.query import Query
-from config.settings import ModelConfig, ProcessingConfig
+from config.settings import ModelConfig, OllamaConfig, ProcessingConfig
 from utils.gpt4_client import GPT4Client
 from utils.ollama_client import OllamaClient
+from utils.cache import TTLCache, make_cache_key, normalize_query
+from utils.query_router import QueryRouter, ROUTE_DIRECT, ROUTE_NO_REWRITE, ROUTE_EXPAND
 import logging
 
 logger = logging.getLogger(__name__)
 
 class QueryProcessor:
-    def __init__(self):
-        self.gpt4_client = GPT4Client()
-        self.ollama_client = OllamaClient()
-        self.processing_config = ProcessingConfig()
-        
-    def semantic_rewrite(self, query: str, use_gpt4: bool = False, model_name: str = "llama2") -> List[str]:
+    def __init__(self, client_registry=None):
         """
-        语义改写：生成与原始查询语义相同但表达方式不同的查询
-        
         Args:
-            query: 原始查询
-            use_gpt4: 是否使用GPT-4
-            model_name: 使用的模型名称（当use_gpt4为False时使用）
+            client_registry: ClientRegistry，提供时与生成回答共用 LLM 客户端
         """
-        messages = [
+        if client_registry is not None:
+            self.gpt4_client = client_registry.get_client("gpt")
+            self.ollama_client = client_registry.get_client("ollama", OllamaConfig.DEFAULT_MODEL)
+        else:
+            self.gpt4_client = GPT4Client()
+            self.ollama_client = OllamaClient()
+        self.processing_config = ProcessingConfig()
+        self.rewrite_cache = TTLCache(
+            max_entries=self.processing_config.REWRITE_CACHE_SIZE,
+            ttl=self.processing_config.REWRITE_CACHE_TTL,
+            namespace="rewrite"
+        ) if self.processing_config.REWRITE_CACHE_ENABLED else None
+        self.router = QueryRouter(self.processing_config)
+        # 语义扩展在线程池中执行，与在调用线程中执行的语义改写并发
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.processing_config.REWRITE_WORKERS,
+            thread_name_prefix="rewrite"
+        )
+        
+    def _rewrite_messages(self, query: str) -> List[Dict[str, str]]:
+        return [
             {
                 "role": "system",
                 "content": f"你是一个查询改写助手。你的任务是将用户的查询改写成不同的表达方式，但保持相同的语义。请生成{self.processing_config.SEMANTIC_REWRITE_LIMIT}个不同的表达方式，每行一个。"
@@ -32,18 +47,29 @@ class QueryProcessor:
                 "content": f"请改写以下查询，保持语义相同但使用不同的表达方式：{query}"
             }
         ]
+
+    def _rewrite_prompt(self, query: str) -> str:
+        return f"你是一个查询改写助手。请将以下查询改写成{self.processing_config.SEMANTIC_REWRITE_LIMIT}个不同的表达方式，保持语义相同，每行一个：\n\n{query}"
+
+    def semantic_rewrite(self, query: str, use_gpt4: bool = False, model_name: str = "llama2") -> List[str]:
+        """
+        语义改写：生成与原始查询语义相同但表达方式不同的查询
         
+        Args:
+            query: 原始查询
+            use_gpt4: 是否使用GPT-4
+            model_name: 使用的模型名称（当use_gpt4为False时使用）
+        """
         try:
             if use_gpt4:
                 # 使用GPT-4生成改写
                 rewrites = self.gpt4_client.get_structured_response(
-                    messages,
+                    self._rewrite_messages(query),
                     temperature=0.7
                 )
             else:
                 # 使用Ollama生成改写
-                prompt = f"你是一个查询改写助手。请将以下查询改写成{self.processing_config.SEMANTIC_REWRITE_LIMIT}个不同的表达方式，保持语义相同，每行一个：\n\n{query}"
-                response = self.ollama_client.generate(prompt, model_name)
+                response = self.ollama_client.generate(self._rewrite_prompt(query), model_name)
                 rewrites = [r.strip() for r in response.split('\n') if r.strip()]
             
             # 过滤掉与原始查询完全相同的结果
@@ -52,17 +78,38 @@ class QueryProcessor:
         except Exception as e:
             logger.error(f"查询改写失败: {str(e)}")
             return [query]  # 出错时返回原始查询
-        
-    def semantic_expansion(self, query: str, use_gpt4: bool = False, model_name: str = "llama2") -> List[str]:
+
+    async def semantic_rewrite_async(
+        self,
+        query: str,
+        use_gpt4: bool = False,
+        model_name: str = "llama2",
+        http_client=None
+    ) -> List[str]:
         """
-        语义扩展：基于原始查询生成相关的子查询
-        
+        semantic_rewrite 的异步版本
+
         Args:
-            query: 原始查询
-            use_gpt4: 是否使用GPT-4
-            model_name: 使用的模型名称（当use_gpt4为False时使用）
+            http_client: 调用 Ollama 使用的 httpx.AsyncClient
         """
-        messages = [
+        try:
+            if use_gpt4:
+                rewrites = await self.gpt4_client.get_structured_response_async(
+                    self._rewrite_messages(query),
+                    temperature=0.7
+                )
+            else:
+                response = await self.ollama_client.generate_async(self._rewrite_prompt(query), model_name, http_client)
+                rewrites = [r.strip() for r in response.split('\n') if r.strip()]
+
+            return list(set([r for r in rewrites if r != query]))
+
+        except Exception as e:
+            logger.error(f"查询改写失败: {str(e)}")
+            return [query]
+        
+    def _expansion_messages(self, query: str) -> List[Dict[str, str]]:
+        return [
             {
                 "role": "system",
                 "content": f"你是一个查询扩展助手。你的任务是基于用户的查询，生成更具体的子查询来探索不同方面。请生成{self.processing_config.SEMANTIC_EXPANSION_LIMIT}个相关的子查询，每行一个。注意：必须采用跟原始查询相同的语种输出。"
@@ -72,18 +119,29 @@ class QueryProcessor:
                 "content": f"请基于以下查询生成更具体的子查询，以探索不同方面，原始查询：{query}"
             }
         ]
+
+    def _expansion_prompt(self, query: str) -> str:
+        return f"你是一个查询扩展助手。请基于以下查询生成{self.processing_config.SEMANTIC_EXPANSION_LIMIT}个更具体的子查询，探索不同方面，每行一个，必须采用跟原始查询相同的语种输出：\n\n原始查询：{query}"
+
+    def semantic_expansion(self, query: str, use_gpt4: bool = False, model_name: str = "llama2") -> List[str]:
+        """
+        语义扩展：基于原始查询生成相关的子查询
         
+        Args:
+            query: 原始查询
+            use_gpt4: 是否使用GPT-4
+            model_name: 使用的模型名称（当use_gpt4为False时使用）
+        """
         try:
             if use_gpt4:
                 # 使用GPT-4生成扩展
                 expansions = self.gpt4_client.get_structured_response(
-                    messages,
+                    self._expansion_messages(query),
                     temperature=0.8
                 )
             else:
                 # 使用Ollama生成扩展
-                prompt = f"你是一个查询扩展助手。请基于以下查询生成{self.processing_config.SEMANTIC_EXPANSION_LIMIT}个更具体的子查询，探索不同方面，每行一个，必须采用跟原始查询相同的语种输出：\n\n原始查询：{query}"
-                response = self.ollama_client.generate(prompt, model_name)
+                response = self.ollama_client.generate(self._expansion_prompt(query), model_name)
                 expansions = [e.strip() for e in response.split('\n') if e.strip()]
             
             # 过滤掉与原始查询完全相同的结果
@@ -92,27 +150,71 @@ class QueryProcessor:
         except Exception as e:
             logger.error(f"查询扩展失败: {str(e)}")
             return [query]  # 出错时返回原始查询
-    
-    def get_all_queries(self, original_query: str, use_gpt4: bool = False, model_name: str = "llama2") -> Query:
+
+    async def semantic_expansion_async(
+        self,
+        query: str,
+        use_gpt4: bool = False,
+        model_name: str = "llama2",
+        http_client=None
+    ) -> List[str]:
         """
-        获取所有查询变体，包括原始查询、语义改写和语义扩展
-        
+        semantic_expansion 的异步版本
+
         Args:
-            original_query: 原始查询
-            use_gpt4: 是否使用GPT-4
-            model_name: 使用的模型名称
+            http_client: 调用 Ollama 使用的 httpx.AsyncClient
         """
+        try:
+            if use_gpt4:
+                expansions = await self.gpt4_client.get_structured_response_async(
+                    self._expansion_messages(query),
+                    temperature=0.8
+                )
+            else:
+                response = await self.ollama_client.generate_async(self._expansion_prompt(query), model_name, http_client)
+                expansions = [e.strip() for e in response.split('\n') if e.strip()]
+
+            return list(set([e for e in expansions if e != query]))
+
+        except Exception as e:
+            logger.error(f"查询扩展失败: {str(e)}")
+            return [query]
+    
+    def cache_stats(self) -> dict:
+        """返回改写缓存的命中统计"""
+        return self.rewrite_cache.stats() if self.rewrite_cache is not None else {}
+
+    def _rewrite_cache_key(self, query: str, use_gpt4: bool, model_name: str, include_expansion: bool) -> str:
+        """改写缓存键：规范化查询 + 模型 + 数量限制 + 提示词版本"""
+        return make_cache_key(
+            normalize_query(query),
+            "gpt4" if use_gpt4 else model_name,
+            self.processing_config.SEMANTIC_REWRITE_LIMIT,
+            self.processing_config.SEMANTIC_EXPANSION_LIMIT if include_expansion else 0,
+            self.processing_config.REWRITE_PROMPT_VERSION
+        )
+
+    def _cached_variants(self, cache_key: str):
+        cached = self.rewrite_cache.get(cache_key) if self.rewrite_cache is not None else None
+        if cached is not None:
+            logger.info("Query rewrite cache hit")
+        return cached
+
+    def _cache_variants(self, cache_key: str, original_query: str, semantic_rewrites: List[str], expanded_queries: List[str]):
+        # 失败时两个方法都会返回 [original_query]，这种结果不写入缓存
+        if self.rewrite_cache is not None and [original_query] not in (semantic_rewrites, expanded_queries):
+            self.rewrite_cache.set(cache_key, [semantic_rewrites, expanded_queries])
+
+    def _build_query(self, original_query: str, semantic_rewrites: List[str], expanded_queries: List[str]) -> Query:
         all_queries = [original_query]  # 始终包含原始查询
         
         # 获取语义改写的查询
-        semantic_rewrites = self.semantic_rewrite(original_query, use_gpt4, model_name)
         if semantic_rewrites:
             all_queries.extend(semantic_rewrites)
             logger.info(f"Generated {len(semantic_rewrites)} semantic rewrites")
             logger.debug(f"Semantic rewrites: {semantic_rewrites}")
         
         # 获取语义扩展的查询
-        expanded_queries = self.semantic_expansion(original_query, use_gpt4, model_name)
         if expanded_queries:
             all_queries.extend(expanded_queries)
             logger.info(f"Generated {len(expanded_queries)} query expansions")
@@ -124,6 +226,69 @@ class QueryProcessor:
         
         logger.info(f"Generated total {len(query.rewritten_queries)} queries")
         return query
+
+    def get_all_queries(
+        self,
+        original_query: str,
+        use_gpt4: bool = False,
+        model_name: str = "llama2",
+        include_expansion: bool = True
+    ) -> Query:
+        """
+        获取所有查询变体，包括原始查询、语义改写和语义扩展
+        
+        Args:
+            original_query: 原始查询
+            use_gpt4: 是否使用GPT-4
+            model_name: 使用的模型名称
+            include_expansion: 是否生成语义扩展
+        """
+        cache_key = self._rewrite_cache_key(original_query, use_gpt4, model_name, include_expansion)
+        cached = self._cached_variants(cache_key)
+        if cached is not None:
+            semantic_rewrites, expanded_queries = cached
+        else:
+            # 两次 LLM 调用相互独立，扩展放到线程池，改写在当前线程执行，每个请求只占用一个池线程
+            expansion_future = self.executor.submit(
+                self.semantic_expansion, original_query, use_gpt4, model_name
+            ) if include_expansion else None
+            semantic_rewrites = self.semantic_rewrite(original_query, use_gpt4, model_name)
+            expanded_queries = expansion_future.result() if expansion_future else []
+            self._cache_variants(cache_key, original_query, semantic_rewrites, expanded_queries)
+        return self._build_query(original_query, semantic_rewrites, expanded_queries)
+
+    async def get_all_queries_async(
+        self,
+        original_query: str,
+        use_gpt4: bool = False,
+        model_name: str = "llama2",
+        include_expansion: bool = True,
+        http_client=None
+    ) -> Query:
+        """
+        get_all_queries 的异步版本，改写和扩展在事件循环中并发执行，不占用线程池
+
+        Args:
+            http_client: 调用 Ollama 使用的 httpx.AsyncClient
+        """
+        cache_key = self._rewrite_cache_key(original_query, use_gpt4, model_name, include_expansion)
+        cached = self._cached_variants(cache_key)
+        if cached is not None:
+            semantic_rewrites, expanded_queries = cached
+        else:
+            calls = [self.semantic_rewrite_async(original_query, use_gpt4, model_name, http_client)]
+            if include_expansion:
+                calls.append(self.semantic_expansion_async(original_query, use_gpt4, model_name, http_client))
+            variants = await asyncio.gather(*calls)
+            semantic_rewrites = variants[0]
+            expanded_queries = variants[1] if include_expansion else []
+            self._cache_variants(cache_key, original_query, semantic_rewrites, expanded_queries)
+        return self._build_query(original_query, semantic_rewrites, expanded_queries)
+
+    def _route(self, query: Query) -> str:
+        if self.processing_config.QUERY_ROUTING_ENABLED:
+            return self.router.route(query.original_text)
+        return ROUTE_EXPAND
     
     def rewrite_query(self, query: Query, use_gpt4: bool = False, model_name: str = "llama2") -> Query:
         """
@@ -134,4 +299,45 @@ class QueryProcessor:
             use_gpt4: 是否使用GPT-4
             model_name: 使用的模型名称
         """
-        return self.get_all_queries(query.original_text, use_gpt4, model_name) 
\ No newline at end of file
+        route = self._route(query)
+        if route in (ROUTE_DIRECT, ROUTE_NO_REWRITE):
+            # 跳过 LLM 改写，只使用原始查询
+            result = Query(original_text=query.original_text)
+        else:
+            result = self.get_all_queries(
+                query.original_text,
+                use_gpt4,
+                model_name,
+                include_expansion=(route == ROUTE_EXPAND)
+            )
+        result.route = route
+        logger.info(f"Query route: {route}")
+        return result
+
+    async def rewrite_query_async(
+        self,
+        query: Query,
+        use_gpt4: bool = False,
+        model_name: str = "llama2",
+        http_client=None
+    ) -> Query:
+        """
+        rewrite_query 的异步版本，供 ASGI 服务使用
+
+        Args:
+            http_client: 调用 Ollama 使用的 httpx.AsyncClient
+        """
+        route = self._route(query)
+        if route in (ROUTE_DIRECT, ROUTE_NO_REWRITE):
+            result = Query(original_text=query.original_text)
+        else:
+            result = await self.get_all_queries_async(
+                query.original_text,
+                use_gpt4,
+                model_name,
+                include_expansion=(route == ROUTE_EXPAND),
+                http_client=http_client
+            )
+        result.route = route
+        logger.info(f"Query route: {route}")
+        return result
@@ -1,5 +1,7 @@
-import requests
-from typing import List
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import os
 import sys
@@ -7,6 +9,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.query import SearchResult
 from config.settings import SearchConfig
+from utils.http_session import get_session
+from utils.cache import TTLCache, make_cache_key, normalize_query
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,36 +21,235 @@ class SearchEngine:
         self.base_url = self.config.SEARX_BASE_URL
         self.engines = self.config.ENGINES
         self.max_results = self.config.MAX_RESULTS_PER_QUERY
+        self.session = get_session(
+            pool_connections=self.config.POOL_CONNECTIONS,
+            pool_maxsize=self.config.POOL_MAXSIZE,
+            max_retries=self.config.MAX_RETRIES,
+            backoff_factor=self.config.RETRY_BACKOFF
+        )
+        # 有截止时间的搜索不重试，避免重试把请求拖过截止时间
+        self.deadline_session = get_session(
+            pool_connections=self.config.POOL_CONNECTIONS,
+            pool_maxsize=self.config.POOL_MAXSIZE,
+            max_retries=0
+        )
+        self.timeout = (self.config.CONNECT_TIMEOUT, self.config.READ_TIMEOUT)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.SEARCH_WORKERS,
+            thread_name_prefix="search"
+        )
+        self.cache = TTLCache(
+            max_entries=self.config.CACHE_MAX_ENTRIES,
+            ttl=self.config.CACHE_TTL,
+            max_bytes=self.config.CACHE_MAX_BYTES,
+            disk_path=self.config.CACHE_DB_PATH,
+            namespace="search"
+        ) if self.config.CACHE_ENABLED else None
+
+    def _cache_key(self, query: str) -> str:
+        """缓存键：规范化后的查询 + 引擎列表 + 最大结果数"""
+        return make_cache_key(
+            normalize_query(query),
+            sorted(self.engines),
+            self.max_results
+        )
+
+    def cache_stats(self) -> Dict:
+        """返回搜索结果缓存的命中统计"""
+        return self.cache.stats() if self.cache is not None else {}
+        
+    def _get_cached(self, query: str) -> Optional[List[SearchResult]]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._cache_key(query))
+        if cached is None:
+            return None
+        logger.debug(f"Search cache hit: {query}")
+        return [SearchResult(**item) for item in cached]
+
+    def _build_params(self, query: str) -> Dict:
+        return {
+            'q': query,
+            'format': 'json',
+            'engines': ','.join(self.engines),
+            'max_results': self.max_results
+        }
+
+    def _parse_results(self, query: str, data: Dict) -> List[SearchResult]:
+        """
+        解析 SearXNG 的 JSON 响应并写入缓存（只缓存成功的响应）。
+        上游引擎失败或限流时 SearXNG 也会返回 200 和空结果，空结果不缓存
+        """
+        search_results = [
+            SearchResult(
+                title=result.get('title', ''),
+                content=result.get('content', ''),
+                url=result.get('url', '')
+            )
+            for result in data.get('results', [])
+        ]
+        if self.cache is not None and search_results:
+            self.cache.set(self._cache_key(query), [asdict(r) for r in search_results])
+        return search_results
         
-    def search(self, query: str) -> List[SearchResult]:
+    def search(
+        self,
+        query: str,
+        timeout: Optional[Tuple[float, float]] = None,
+        retry: bool = True
+    ) -> List[SearchResult]:
         try:
-            params = {
-                'q': query,
-                'format': 'json',
-                'engines': ','.join(self.engines),
-                'max_results': self.max_results
-            }
+            cached = self._get_cached(query)
+            if cached is not None:
+                return cached
             
-            response = requests.get(
+            session = self.session if retry else self.deadline_session
+            response = session.get(
                 f"{self.base_url}/search",
-                params=params,
-                timeout=10
+                params=self._build_params(query),
+                timeout=timeout or self.timeout
             )
             response.raise_for_status()
-            
-            results = response.json().get('results', [])
-            return [
-                SearchResult(
-                    title=result.get('title', ''),
-                    content=result.get('content', ''),
-                    url=result.get('url', '')
-                )
-                for result in results
-            ]
+            return self._parse_results(query, response.json())
             
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             return [] 
+
+    def _remaining_timeout(self, deadline_at: float) -> Optional[Tuple[float, float]]:
+        """由距截止时间（time.perf_counter() 时间点）的剩余时间得到 (连接, 读取) 超时，已到期时返回 None"""
+        remaining = deadline_at - time.perf_counter()
+        if remaining <= 0:
+            return None
+        return min(self.config.CONNECT_TIMEOUT, remaining), min(self.config.READ_TIMEOUT, remaining)
+
+    async def search_async(self, query: str, client, deadline_at: Optional[float] = None) -> List[SearchResult]:
+        """
+        异步搜索，与 search 共用缓存
+
+        Args:
+            query: 查询文本
+            client: httpx.AsyncClient
+            deadline_at: 搜索阶段的截止时间（time.perf_counter() 时间点），超时由剩余时间得到
+        """
+        import httpx
+        timeout = httpx.Timeout(self.config.READ_TIMEOUT, connect=self.config.CONNECT_TIMEOUT)
+        if deadline_at is not None:
+            remaining = self._remaining_timeout(deadline_at)
+            if remaining is None:
+                return []
+            timeout = httpx.Timeout(remaining[1], connect=remaining[0])
+        try:
+            cached = self._get_cached(query)
+            if cached is not None:
+                return cached
+
+            response = await client.get(
+                f"{self.base_url}/search",
+                params=self._build_params(query),
+                timeout=timeout
+            )
+            response.raise_for_status()
+            return self._parse_results(query, response.json())
+
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            return []
+
+    def _timed_search(self, query: str, deadline_at: Optional[float] = None) -> Tuple[List[SearchResult], float]:
+        """
+        执行单个搜索并记录耗时（秒）
+
+        Args:
+            deadline_at: 搜索阶段的截止时间（time.perf_counter() 时间点）。连接和读取超时由剩余时间得到，
+                并且不重试，超时的搜索线程最迟在截止时间附近退出
+        """
+        start = time.perf_counter()
+        if deadline_at is None:
+            results = self.search(query)
+        else:
+            timeout = self._remaining_timeout(deadline_at)
+            # 排队到截止时间之后才开始执行的搜索直接放弃
+            results = self.search(query, timeout, retry=False) if timeout is not None else []
+        elapsed = time.perf_counter() - start
+        logger.info(f"Search '{query}' returned {len(results)} results in {elapsed * 1000:.0f} ms")
+        return results, elapsed
+
+    def iter_search_many(
+        self,
+        queries: List[str],
+        deadline: Optional[float] = None
+    ) -> Iterator[Tuple[str, List[SearchResult], float]]:
+        """
+        并发执行多个查询的搜索，按完成顺序逐个产出结果，调用方可以边搜索边处理。
+        同时进行的搜索不超过 MAX_CONCURRENT_SEARCHES；整个搜索阶段共用一个截止时间
+
+        Args:
+            queries: 查询列表
+            deadline: 搜索阶段的总截止时间（秒），默认使用 SearchConfig.SEARCH_DEADLINE
+
+        Yields:
+            (查询, 搜索结果, 耗时秒数)，截止时间前未返回的查询会被丢弃
+        """
+        queries = list(dict.fromkeys(queries))
+        if not queries:
+            return
+        deadline = self.config.SEARCH_DEADLINE if deadline is None else deadline
+        limit = max(1, self.config.MAX_CONCURRENT_SEARCHES)
+
+        start = time.perf_counter()
+        deadline_at = start + deadline
+        waiting = list(queries)
+        futures = {}
+
+        def submit_next():
+            while waiting and len(futures) < limit:
+                query = waiting.pop(0)
+                futures[self.executor.submit(self._timed_search, query, deadline_at)] = query
+
+        submit_next()
+        try:
+            while futures:
+                remaining = deadline_at - time.perf_counter()
+                if remaining <= 0:
+                    break
+                done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query = futures.pop(future)
+                    results, elapsed = future.result()
+                    yield query, results, elapsed
+                submit_next()
+        finally:
+            # 超时未返回的搜索不再等待，其连接和读取超时已限制在截止时间内
+            missed = len(futures) + len(waiting)
+            for future in futures:
+                future.cancel()
+        if missed:
+            logger.warning(f"{missed}/{len(queries)} searches missed the {deadline:.1f}s deadline")
+        logger.info(
+            f"Concurrent search of {len(queries)} queries finished in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+    def search_many(self, queries: List[str], deadline: Optional[float] = None) -> List[SearchResult]:
+        """
+        并发执行多个查询的搜索，总耗时取决于最慢的单个查询而不是所有查询之和
+
+        Args:
+            queries: 查询列表
+            deadline: 总截止时间（秒），默认使用 SearchConfig.SEARCH_DEADLINE
+
+        Returns:
+            按查询顺序合并的搜索结果，超时未返回的查询会被丢弃
+        """
+        by_query = {}
+        for query, results, _ in self.iter_search_many(queries, deadline):
+            by_query[query] = results
+
+        all_results = []
+        for query in queries:
+            all_results.extend(by_query.pop(query, []))
+        return all_results
         
 # 测试
 if __name__ == "__main__":
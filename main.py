@@ -6,13 +6,24 @@ sys.path.insert(0, project_root)
 from core.query_processor import QueryProcessor
 from core.search_engine import SearchEngine
 from core.document_processor import DocumentProcessor
-from core.llm_handler import LLMHandler
+from utils.page_fetcher import PageFetcher
 from models.query import Query
 from models.response import Response
 from models.document import Chunk
 import logging
-from config.settings import LogConfig
-from typing import Dict, Generator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+import time
+from config.settings import LogConfig, FetchConfig, ModelConfig, OllamaConfig, ProcessingConfig
+from utils.query_router import ROUTE_DIRECT
+from utils.deduplicator import SeenResults
+from utils.answer_cache import AnswerCache
+from utils.client_registry import ClientRegistry
+from utils.model_catalog import ModelCatalog
+from utils.context_builder import load_tokenizer
+from utils.metrics import GenerationTracker, MetricsRegistry, RequestTrace, record_fetch, record_processing
+from typing import Dict, Generator, List, Optional, Tuple
 
 def setup_logging():
     """配置日志"""
@@ -20,7 +31,12 @@ def setup_logging():
         level=getattr(logging, LogConfig.LOG_LEVEL),
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler(LogConfig.LOG_FILE),
+            RotatingFileHandler(
+                LogConfig.LOG_FILE,
+                maxBytes=LogConfig.LOG_MAX_BYTES,
+                backupCount=LogConfig.LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            ),
             logging.StreamHandler()
         ]
     )
@@ -29,10 +45,108 @@ class RAGSearch:
     def __init__(self):
         setup_logging()
         self.logger = logging.getLogger(__name__)
-        self.query_processor = QueryProcessor()
+        self.client_registry = ClientRegistry()
+        self.query_processor = QueryProcessor(self.client_registry)
         self.search_engine = SearchEngine()
         self.document_processor = DocumentProcessor()
-        self.llm_handler = LLMHandler()
+        self.page_fetcher = PageFetcher() if FetchConfig.ENABLED else None
+        # 每个搜索返回后在该线程池中抓取页面并处理文档，不阻塞等待其余搜索的循环
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=ProcessingConfig.BATCH_WORKERS,
+            thread_name_prefix="batch"
+        )
+        self.model_catalog = ModelCatalog(self.client_registry.get_client("ollama", OllamaConfig.DEFAULT_MODEL))
+        self.answer_cache = AnswerCache() if ModelConfig.ANSWER_CACHE_ENABLED else None
+        self.metrics = MetricsRegistry()
+        self._register_metric_collectors()
+        # 模型在 warm_up 中加载，构造阶段不加载任何权重
+        self._ready = threading.Event()
+        self._warmup_thread = None
+        self.warmup_seconds = None
+        self.warmup_error = None  # 模型加载失败时的错误信息，此时服务不会进入就绪状态
+        
+    def _register_metric_collectors(self):
+        """把各组件已有的统计接入 /metrics"""
+        self.metrics.register_collector("search_cache", self.search_engine.cache_stats)
+        self.metrics.register_collector("rewrite_cache", self.query_processor.cache_stats)
+        self.metrics.register_collector("rerank_cache", self.document_processor.reranker.cache_stats)
+        self.metrics.register_collector("rerank_scheduler", self.document_processor.reranker.scheduler_stats)
+        deduplicator = self.document_processor.deduplicator
+        if deduplicator is not None:
+            self.metrics.register_collector("dedup", deduplicator.stats)
+        if self.answer_cache is not None:
+            self.metrics.register_collector("answer_cache", self.answer_cache.stats)
+        if self.page_fetcher is not None and self.page_fetcher.page_cache is not None:
+            self.metrics.register_collector("page_cache", self.page_fetcher.page_cache.stats)
+
+    def warm_up(self, background: bool = False):
+        """
+        加载重排序/嵌入模型并预先创建 LLM 客户端
+
+        Args:
+            background: 为 True 时在后台线程中执行，立即返回
+        """
+        if background:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(target=self._warm_up, name="rag-warmup", daemon=True)
+                self._warmup_thread.start()
+            return
+        self._warm_up()
+
+    def _warm_up(self):
+        if self._ready.is_set():
+            return
+        start = time.perf_counter()
+        self.warmup_error = None
+        try:
+            self.document_processor.reranker.load()
+            prefilter = self.document_processor.prefilter
+            embedding = prefilter.embedding if prefilter is not None else None
+            if embedding is not None:
+                embedding.model
+        except Exception as e:
+            self.warmup_error = f"模型加载失败: {str(e)}"
+            self.logger.error(f"Error loading models during warm-up: {str(e)}")
+        # 分词器加载失败时使用估算的 token 数，不影响就绪状态
+        load_tokenizer()
+        self.client_registry.warm_up()
+        try:
+            self.model_catalog.refresh()
+        except Exception as e:
+            self.logger.warning(f"Error fetching model list during warm-up: {str(e)}")
+        self.warmup_seconds = time.perf_counter() - start
+        if self.warmup_error is not None:
+            self.logger.error(f"Warm-up failed after {self.warmup_seconds:.1f}s, service is not ready")
+            return
+        self._ready.set()
+        self.logger.info(f"Warm-up finished in {self.warmup_seconds:.1f}s")
+
+    def is_ready(self) -> bool:
+        """warm_up 完成且模型加载成功后返回 True，供就绪探针使用"""
+        return self._ready.is_set()
+
+    def process_batch(
+        self,
+        results: list,
+        query_text: str,
+        seen: SeenResults,
+        fetch_deadline_at: float
+    ) -> Tuple[List, Optional[Tuple[float, float]]]:
+        """
+        在工作线程中处理一个搜索返回的结果：抓取完整页面，再清理、分块并跨批次去重
+
+        Returns:
+            (文档列表, 抓取阶段的 (开始, 结束) perf_counter 时间点)，未开启页面抓取时后者为 None
+        """
+        fetch_window = None
+        if self.page_fetcher is not None:
+            # 只抓取其他批次没有抓取过的页面，超过请求共享的抓取截止时间的页面回退为摘要
+            results = seen.claim_fetches(results)
+            fetch_start = time.perf_counter()
+            results = self.page_fetcher.fetch_results(results, deadline_at=fetch_deadline_at)
+            fetch_window = (fetch_start, time.perf_counter())
+        documents = list(self.document_processor.iter_documents(results, query_text, seen))
+        return documents, fetch_window
         
     def process_query_stream(self, user_query: str, llm_type: str = "ollama", model_name: str = "llama2") -> Generator[Dict, None, None]:
         """
@@ -44,46 +158,125 @@ class RAGSearch:
             model_name: 模型名称 (对于ollama可以是"llama2"等，对于gpt可以是"gpt-4"等)
             
         Yields:
-            包含答案片段或源文档的字典
+            包含答案片段或源文档的字典；开启 STREAM_PROGRESS_EVENTS 时还会产出
+            {'progress': {'stage': ..., 'elapsed_ms': ...}} 形式的阶段进度事件
         """
+        trace = RequestTrace(user_query, self.metrics)
+        error = None
         try:
+            start_time = trace.started_at
+
+            def progress(stage: str, **info) -> Dict:
+                """阶段进度事件，elapsed_ms 为从请求开始到当前的耗时"""
+                info['stage'] = stage
+                info['elapsed_ms'] = round((time.perf_counter() - start_time) * 1000, 1)
+                return {'progress': info}
+
+            emit_progress = ProcessingConfig.STREAM_PROGRESS_EVENTS
+
             # 创建查询对象
             query = Query(original_text=user_query)
             
             # 查询改写
             use_gpt4 = "gpt" in llm_type.lower()
-            query = self.query_processor.rewrite_query(query, use_gpt4=use_gpt4, model_name=model_name)
-            self.logger.info(f"改写后的查询: {query.rewritten_queries}")
+            with trace.span('rewrite') as sizes:
+                query = self.query_processor.rewrite_query(query, use_gpt4=use_gpt4, model_name=model_name)
+                sizes['queries'] = len(query.rewritten_queries)
+            self.logger.info(f"查询路由: {query.route}, 改写后的查询: {query.rewritten_queries}")
+            if emit_progress:
+                yield progress('rewrite', route=query.route, queries=query.rewritten_queries)
             
-            # 搜索结果获取
-            all_results = []
-            for q in query.rewritten_queries:
-                results = self.search_engine.search(q)
-                all_results.extend(results)
-            self.logger.info(f"获取到 {len(all_results)} 条搜索结果")
-            
-            # 文档处理
-            documents = self.document_processor.process_documents(all_results)
-            self.logger.info(f"处理得到 {len(documents)} 个文档")
-            
-            # 重排序
-            ranked_chunks = self.document_processor.rerank_chunks(
-                query.original_text,
-                documents
-            )
-            self.logger.info(f"重排序得到 {len(ranked_chunks)} 个相关文本块")
+            if query.route == ROUTE_DIRECT:
+                # 不需要检索，直接生成回答
+                ranked_chunks = []
+            else:
+                # 每个搜索返回后立即交给工作线程抓取、清理和分块，与其余仍在进行的搜索重叠；
+                # 搜索的截止时间只约束搜索本身，抓取截止时间从检索开始计算，所有批次共享
+                documents = []
+                result_count = 0
+                seen = SeenResults()
+                fetch_deadline_at = time.monotonic() + FetchConfig.DEADLINE
+                batches = []
+                fetch_windows = []
+                try:
+                    for q, results, elapsed in self.search_engine.iter_search_many(query.rewritten_queries):
+                        result_count += len(results)
+                        trace.record('search', elapsed, results=len(results))
+                        if emit_progress:
+                            yield progress('search', query=q, results=len(results), search_ms=round(elapsed * 1000, 1))
+                        batches.append((q, self.batch_executor.submit(
+                            self.process_batch, results, query.original_text, seen, fetch_deadline_at
+                        )))
+
+                    # 按搜索返回的顺序收集各批次的文档
+                    for q, future in batches:
+                        batch, fetch_window = future.result()
+                        if fetch_window is not None:
+                            fetch_windows.append(fetch_window)
+                        documents.extend(batch)
+                        if emit_progress:
+                            yield progress(
+                                'process',
+                                query=q,
+                                documents=len(batch),
+                                chunks=sum(len(doc.chunks) for doc in batch)
+                            )
+                finally:
+                    # 客户端断开或出错时取消尚未开始的批次
+                    for _, future in batches:
+                        future.cancel()
+                # 抓取、清理和分块按请求汇总，每个阶段只记录一次
+                record_fetch(trace, fetch_windows, result_count)
+                record_processing(trace, documents)
+                self.logger.info(f"获取到 {result_count} 条搜索结果，处理得到 {len(documents)} 个文档")
+                
+                # 重排序
+                with trace.span('rerank', candidates=sum(len(doc.chunks) for doc in documents)) as sizes:
+                    ranked_chunks = self.document_processor.rerank_chunks(
+                        query.original_text,
+                        documents
+                    )
+                    sizes['chunks'] = len(ranked_chunks)
+                self.logger.info(f"重排序得到 {len(ranked_chunks)} 个相关文本块")
+                if emit_progress:
+                    yield progress('rerank', chunks=len(ranked_chunks))
             
-            # 使用指定的LLM类型和模型流式生成回答
-            self.llm_handler = LLMHandler(llm_type=llm_type, model_name=model_name)
-            for response in self.llm_handler.generate_response_stream(
-                query.original_text, 
-                ranked_chunks
-            ):
+            # 使用指定的LLM类型和模型流式生成回答，每个请求使用自己的 LLMHandler
+            llm_handler = self.client_registry.get_handler(llm_type, model_name)
+            generation = GenerationTracker(trace, llm_handler)
+            cache_key = None
+            cached = None
+            if self.answer_cache is not None:
+                cache_key = self.answer_cache.key(query.original_text, llm_type, model_name, ranked_chunks)
+                with trace.span('answer_cache') as sizes:
+                    cached = self.answer_cache.get(cache_key)
+                    sizes['hit'] = int(cached is not None)
+            if cached is not None:
+                # 相同问题和相同参考文档，直接回放缓存的回答
+                self.logger.info("回答缓存命中")
+                responses = self.answer_cache.replay(llm_handler.sources_event(ranked_chunks), cached)
+            else:
+                responses = llm_handler.generate_response_stream(query.original_text, ranked_chunks)
+                if cache_key is not None:
+                    responses = self.answer_cache.record(cache_key, responses)
+            for response in responses:
+                if generation.observe(response) and emit_progress:
+                    yield progress('first_token')
+                if 'error' in response:
+                    error = response['error']
                 yield response
+            generation.finish()
+            if emit_progress:
+                yield progress('done')
+            self.logger.info(f"查询处理完成，总耗时 {(time.perf_counter() - start_time) * 1000:.0f} ms")
                 
         except Exception as e:
+            error = str(e)
             self.logger.error(f"Error processing query: {str(e)}")
             yield {"error": f"处理查询时发生错误: {str(e)}"}
+        finally:
+            # 客户端断开时生成器被关闭，同样记录已完成的阶段
+            trace.finish(error)
     
     def process_query(self, user_query: str, llm_type: str = "ollama", model_name: str = "llama2") -> str:
         """
@@ -120,7 +313,10 @@ class RAGSearch:
                         score=source["score"]
                     ) for source in (full_response["sources"] or [])
                 ],
-                confidence_score=max([s["score"] for s in full_response["sources"]]) if full_response["sources"] else 0.0
+                confidence_score=max(
+                    [s["score"] for s in full_response["sources"] or [] if s["score"] is not None],
+                    default=0.0
+                )
             )
             
         except Exception as e:
@@ -154,14 +350,18 @@ def main():
             sources_shown = False
             for response in rag_search.process_query_stream(query, llm_type="ollam", model_name="llama3:8b"):
                 if "sources" in response and not sources_shown:
-                    print("\n支持的文档:")
-                    for source in response["sources"]:
-                        print(f"- {source['title']} ({source['url']}) 相关度: {source['score']:.3f}")
                     sources_shown = True
-                    max_score = max(s["score"] for s in response["sources"])
-                    print(f"\n置信度: {max_score:.3f}")
+                    # 直接回答路由没有参考文档，分数也可能为空
+                    scores = [s["score"] for s in response["sources"] if s["score"] is not None]
+                    if response["sources"]:
+                        print("\n支持的文档:")
+                        for source in response["sources"]:
+                            score = f"{source['score']:.3f}" if source["score"] is not None else "-"
+                            print(f"- {source['title']} ({source['url']}) 相关度: {score}")
+                    if scores:
+                        print(f"\n置信度: {max(scores):.3f}")
                     print("\n回答:", end=" ", flush=True)
-                elif "content" in response:
+                elif isinstance(response.get("content"), str):
                     print(response["content"], end="", flush=True)
                 elif "error" in response:
                     print(f"\n发生错误: {response['error']}")
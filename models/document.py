@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 @dataclass
 class Chunk:
@@ -13,4 +13,5 @@ class Chunk:
 class Document:
     chunks: List[Chunk]
     source_url: str
-    title: str 
\ No newline at end of file
+    title: str
+    timings: Optional[Dict[str, float]] = None  # 清理和分块耗时（秒），用于请求追踪 
\ No newline at end of file
@@ -6,6 +6,7 @@ class Query:
     original_text: str
     rewritten_queries: List[str] = None
     timestamp: float = None
+    route: Optional[str] = None  # 查询路由结果，见 utils/query_router.py
     
     def __post_init__(self):
         import time
@@ -17,4 +18,5 @@ class SearchResult:
     title: str
     content: str
     url: str
-    score: Optional[float] = None 
\ No newline at end of file
+    score: Optional[float] = None
+    clean_seconds: Optional[float] = None  # 内容已在抓取阶段清理时为清理耗时（秒，缓存命中为 0），None 表示未清理 
\ No newline at end of file
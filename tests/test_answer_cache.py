@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import ModelConfig
+from models.document import Chunk
+from utils.answer_cache import AnswerCache
+
+CHUNKS = [
+    Chunk(text="检索增强生成", score=0.9, source_url="https://a.example", title="a"),
+    Chunk(text="retrieval augmented generation", score=0.5, source_url="https://b.example", title="b"),
+]
+SOURCES = {'sources': [{'url': c.source_url, 'title': c.title, 'score': c.score} for c in CHUNKS]}
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(max_entries=16, ttl=60, max_bytes=1024 * 1024, replay_rate=0.0)
+
+
+def stream(*events):
+    yield SOURCES
+    yield from events
+
+
+async def astream(*events):
+    yield SOURCES
+    for event in events:
+        yield event
+
+
+def test_key_normalizes_query_and_ignores_scores(cache):
+    rescored = [Chunk(text=c.text, score=0.1, source_url=c.source_url, title=c.title) for c in CHUNKS]
+    assert cache.key("什么是 RAG？", "ollama", "llama3", CHUNKS) == cache.key("  什么是 rag？ ", "ollama", "llama3", rescored)
+
+
+def test_key_depends_on_model_chunks_and_prompt_version(cache, monkeypatch):
+    base = cache.key("q", "ollama", "llama3", CHUNKS)
+    assert cache.key("q", "ollama", "qwen2", CHUNKS) != base
+    assert cache.key("q", "gpt", "llama3", CHUNKS) != base
+    assert cache.key("q", "ollama", "llama3", CHUNKS[:1]) != base
+    assert cache.key("q", "ollama", "llama3", list(reversed(CHUNKS))) != base
+    monkeypatch.setattr(ModelConfig, "PROMPT_VERSION", "test")
+    assert cache.key("q", "ollama", "llama3", CHUNKS) != base
+
+
+def test_gpt_key_ignores_model_name(cache):
+    assert cache.key("q", "gpt", "gpt-4", CHUNKS) == cache.key("q", "gpt", None, CHUNKS)
+
+
+def test_records_complete_stream_and_replays_in_order(cache):
+    events = [{'content': "检索"}, {'content': "增强"}, {'content': "生成"}]
+    assert list(cache.record("k", stream(*events))) == [SOURCES] + events
+    assert cache.get("k") == events
+    assert list(cache.replay(SOURCES, cache.get("k"))) == [SOURCES] + events
+
+
+def test_skips_stream_with_error_event(cache):
+    list(cache.record("k", stream({'content': "部分"}, {'error': "boom"})))
+    assert cache.get("k") is None
+
+
+def test_skips_interrupted_stream(cache):
+    recorder = cache.record("k", stream({'content': "a"}, {'content': "b"}, {'content': "c"}))
+    next(recorder)
+    next(recorder)
+    # 客户端断开时生成器被关闭
+    recorder.close()
+    assert cache.get("k") is None
+
+
+def test_skips_stream_raising_midway(cache):
+    def failing():
+        yield SOURCES
+        yield {'content': "部分"}
+        raise RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        list(cache.record("k", failing()))
+    assert cache.get("k") is None
+
+
+def test_skips_stream_without_content(cache):
+    list(cache.record("k", stream({'content': ""})))
+    assert cache.get("k") is None
+
+
+def test_async_record_and_replay(cache):
+    events = [{'content': "a"}, {'content': "b"}]
+
+    async def run():
+        recorded = [event async for event in cache.arecord("k", astream(*events))]
+        failed = [event async for event in cache.arecord("f", astream({'content': "x"}, {'error': "boom"}))]
+        replayed = [event async for event in cache.areplay(SOURCES, cache.get("k"))]
+        return recorded, failed, replayed
+
+    recorded, failed, replayed = asyncio.run(run())
+    assert recorded == replayed == [SOURCES] + events
+    assert failed[-1] == {'error': "boom"}
+    assert cache.get("f") is None
+
+
+def test_gpt_stream_failure_becomes_error_event_and_is_not_cached(cache):
+    from core.llm_handler import LLMHandler
+    from utils.gpt4_client import GPT4Client
+
+    def create(**kwargs):
+        raise RuntimeError("rate limited")
+
+    client = GPT4Client()
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    with pytest.raises(RuntimeError):
+        list(client.get_completion_stream([{"role": "user", "content": "q"}]))
+
+    handler = LLMHandler(llm_type="gpt", client=client)
+    events = list(cache.record("k", handler.generate_response_stream("q", CHUNKS)))
+    assert 'error' in events[-1]
+    assert not any(isinstance(event.get('content'), str) and "rate limited" in event['content'] for event in events)
+    assert cache.get("k") is None
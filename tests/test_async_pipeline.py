@@ -0,0 +1,111 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from core.async_pipeline import AsyncRAGSearch
+from models.document import Chunk, Document
+from models.query import SearchResult
+from utils.query_router import ROUTE_DIRECT, QueryRouter
+
+pytest.importorskip("httpx")
+
+
+class FakeQueryProcessor:
+    async def rewrite_query_async(self, query, use_gpt4, model_name, http_client):
+        query.route = QueryRouter().route(query.original_text)
+        if query.route != ROUTE_DIRECT:
+            # 重复的改写只搜索一次
+            query.rewritten_queries = ["slow q", "fast q", "fast q"]
+        return query
+
+
+class FakeSearchEngine:
+    def __init__(self):
+        self.queries = []
+
+    async def search_async(self, query, client, deadline_at=None):
+        self.queries.append(query)
+        await asyncio.sleep(0.05 if query.startswith("slow") else 0)
+        return [SearchResult(title=query, content=f"{query} 摘要", url=f"https://example.com/{query}")]
+
+
+class FakeDocumentProcessor:
+    def rerank_chunks(self, query, documents):
+        return [chunk for doc in documents for chunk in doc.chunks]
+
+
+class FakeHandler:
+    prompt_chars = 0
+    prompt_tokens = 0
+
+    async def generate_response_stream_async(self, query, relevant_chunks, http_client=None):
+        yield {'sources': [{'url': chunk.source_url} for chunk in relevant_chunks]}
+        for token in ("答", "案"):
+            yield {'content': token}
+
+
+def process_batch(results, query, seen, fetch_deadline_at):
+    documents = [
+        Document(chunks=[Chunk(text=r.content, source_url=r.url, title=r.title)], source_url=r.url, title=r.title)
+        for r in results
+    ]
+    return documents, None
+
+
+@pytest.fixture
+def pipeline():
+    rag = SimpleNamespace(
+        metrics=None,
+        query_processor=FakeQueryProcessor(),
+        search_engine=FakeSearchEngine(),
+        batch_executor=ThreadPoolExecutor(max_workers=2),
+        process_batch=process_batch,
+        document_processor=FakeDocumentProcessor(),
+        client_registry=SimpleNamespace(get_handler=lambda llm_type, model_name: FakeHandler()),
+        answer_cache=None
+    )
+    pipeline = AsyncRAGSearch(rag, executor_workers=2)
+    yield pipeline
+    rag.batch_executor.shutdown(wait=False)
+
+
+def collect(pipeline, query):
+    async def run():
+        try:
+            return [event async for event in pipeline.process_query_stream(query, "ollama", "stub")]
+        finally:
+            await pipeline.aclose()
+    return asyncio.run(run())
+
+
+def describe(event):
+    if 'progress' in event:
+        progress = event['progress']
+        return f"{progress['stage']}:{progress['query']}" if 'query' in progress else progress['stage']
+    return next(iter(event))
+
+
+def test_events_follow_pipeline_stages(pipeline):
+    events = collect(pipeline, "什么是检索增强生成以及它和微调的区别")
+    # 搜索按返回顺序输出，处理结果按搜索返回的顺序收集
+    assert [describe(event) for event in events] == [
+        "rewrite",
+        "search:fast q", "search:slow q",
+        "process:fast q", "process:slow q",
+        "rerank",
+        "sources", "first_token", "content", "content",
+        "done",
+    ]
+    assert sorted(pipeline.rag_search.search_engine.queries) == ["fast q", "slow q"]
+    assert [source['url'] for source in events[6]['sources']] == [
+        "https://example.com/fast q", "https://example.com/slow q"
+    ]
+
+
+def test_direct_route_skips_search_and_rerank(pipeline):
+    events = collect(pipeline, "hello")
+    assert [describe(event) for event in events] == ["rewrite", "sources", "first_token", "content", "content", "done"]
+    assert events[0]['progress']['route'] == ROUTE_DIRECT
+    assert pipeline.rag_search.search_engine.queries == []
@@ -0,0 +1,76 @@
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import TTLCache, make_cache_key, normalize_query
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock.time)
+    return clock
+
+
+def test_normalize_query_and_key():
+    assert normalize_query("  ＲＡＧ   是什么\n") == "rag 是什么"
+    assert make_cache_key(normalize_query("RAG 是什么"), ["bing", "google"], 5) == \
+        make_cache_key(normalize_query("rag  是什么"), ["bing", "google"], 5)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(max_entries=10, ttl=60)
+    cache.set("k", [1, 2])
+    clock.now += 59
+    assert cache.get("k") == [1, 2]
+    clock.now += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+    assert cache.stats()['misses'] == 1
+
+
+def test_lru_eviction_keeps_recently_used(clock):
+    cache = TTLCache(max_entries=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_values(clock):
+    cache = TTLCache(max_entries=100, ttl=None, max_bytes=20)
+    cache.set("a", "x" * 12)
+    cache.set("b", "y" * 12)
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 12
+    cache.set("huge", "z" * 100)
+    assert cache.get("huge") is None
+    assert cache.stats()['bytes'] <= 20
+
+
+def test_reload_from_sqlite_tier(clock, tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    TTLCache(max_entries=10, ttl=60, disk_path=path, namespace="search").set("k", {'results': [1]})
+
+    # 新进程的内存层为空，从 sqlite 层读取并回填内存层
+    reloaded = TTLCache(max_entries=10, ttl=60, disk_path=path, namespace="search")
+    assert reloaded.get("k") == {'results': [1]}
+    assert reloaded.get("k") == {'results': [1]}
+    stats = reloaded.stats()
+    assert (stats['disk_hits'], stats['hits']) == (1, 1)
+
+    # 命名空间相互隔离，过期条目不会从 sqlite 层读回
+    assert TTLCache(max_entries=10, ttl=60, disk_path=path, namespace="rewrite").get("k") is None
+    clock.now += 61
+    assert TTLCache(max_entries=10, ttl=60, disk_path=path, namespace="search").get("k") is None
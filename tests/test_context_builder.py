@@ -0,0 +1,143 @@
+import pytest
+
+from models.document import Chunk
+from utils import context_builder
+from utils.context_builder import ContextBuilder, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokens(monkeypatch):
+    """固定使用估算的 token 数，测试结果不依赖分词器能否加载"""
+    monkeypatch.setattr(context_builder, "_tokenizer_loaded", True)
+    monkeypatch.setattr(context_builder, "_tokenizer", None)
+
+
+def chunk(text, score, url="https://a.example/page", start=None, end=None):
+    metadata = {'start': start, 'end': end} if start is not None else {}
+    return Chunk(text=text, score=score, metadata=metadata, source_url=url, title="t")
+
+
+def test_heuristic_token_count():
+    assert count_tokens("") == 0
+    # 2 个汉字 + "world" 按 4 字符一个计 2 个 + 1 个标点
+    assert count_tokens("你好 world!") == 5
+    assert count_tokens("检索增强生成") == 6
+    assert count_tokens("abcd efgh") == 2
+
+
+def test_missing_tokenizer_falls_back_and_logs_once(monkeypatch, caplog):
+    from config.settings import ModelConfig
+
+    monkeypatch.setattr(context_builder, "_tokenizer_loaded", False)
+    monkeypatch.setattr(ModelConfig, "CONTEXT_TOKENIZER", None)
+    with caplog.at_level("WARNING", logger="utils.context_builder"):
+        assert count_tokens("你好 world!") == 5
+        assert count_tokens("检索增强生成") == 6
+    assert len([r for r in caplog.records if "heuristic" in r.getMessage()]) == 1
+
+
+def test_merges_chunks_by_offsets():
+    builder = ContextBuilder(token_budget=1000, min_overlap=3)
+    packed = builder.build([
+        chunk("第二段内容", 0.5, start=5, end=10),
+        chunk("第一段内容", 0.9, start=0, end=5),
+    ])
+    assert len(packed.chunks) == 1
+    merged = packed.chunks[0]
+    assert merged.text == "第一段内容 第二段内容"
+    assert merged.score == 0.9
+    assert (merged.metadata['start'], merged.metadata['end']) == (0, 10)
+    assert merged.metadata['source_indices'] == [0, 1]
+    assert packed.merged == 1
+
+
+def test_merges_chunks_by_text_overlap_without_offsets():
+    builder = ContextBuilder(token_budget=1000, min_overlap=4)
+    packed = builder.build([
+        chunk("alpha beta gamma delta", 0.8),
+        chunk("gamma delta epsilon", 0.6),
+    ])
+    assert [c.text for c in packed.chunks] == ["alpha beta gamma delta epsilon"]
+
+
+def test_does_not_merge_chunks_from_different_sources():
+    builder = ContextBuilder(token_budget=1000, min_overlap=4)
+    packed = builder.build([
+        chunk("alpha beta gamma delta", 0.8, url="https://a.example"),
+        chunk("gamma delta epsilon", 0.6, url="https://b.example"),
+    ])
+    assert len(packed.chunks) == 2
+    assert packed.merged == 0
+
+
+def test_drops_redundant_chunk_and_cites_it_through_the_container():
+    builder = ContextBuilder(token_budget=1000)
+    packed = builder.build([
+        chunk("检索增强生成先召回文档再生成回答", 0.9, url="https://a.example"),
+        chunk("召回文档", 0.4, url="https://b.example"),
+    ])
+    assert [c.text for c in packed.chunks] == ["检索增强生成先召回文档再生成回答"]
+    assert packed.chunks[0].metadata['source_indices'] == [0, 1]
+    assert packed.dropped == 1
+
+
+def test_drops_low_score_chunks_over_budget():
+    builder = ContextBuilder(token_budget=10)
+    packed = builder.build([
+        chunk("一二三四五六", 0.9, url="https://a.example"),
+        chunk("甲乙丙丁戊己", 0.5, url="https://b.example"),
+        chunk("子丑", 0.1, url="https://c.example"),
+    ])
+    assert [c.text for c in packed.chunks] == ["一二三四五六", "子丑"]
+    assert [c.metadata['source_indices'] for c in packed.chunks] == [[0], [2]]
+    assert packed.tokens == 8
+    assert packed.dropped == 1
+    assert not packed.truncated
+
+
+def test_truncates_top_chunk_larger_than_budget():
+    builder = ContextBuilder(token_budget=10)
+    packed = builder.build([
+        chunk("汉" * 50, 0.9, url="https://a.example"),
+        chunk("字" * 5, 0.5, url="https://b.example"),
+    ])
+    assert packed.truncated
+    assert count_tokens(packed.chunks[0].text) <= 10
+    assert packed.tokens <= 10
+    assert packed.chunks[0].text.startswith("汉")
+
+
+def test_min_score_filters_candidates():
+    builder = ContextBuilder(token_budget=1000, min_score=0.3)
+    packed = builder.build([
+        chunk("保留", 0.9, url="https://a.example"),
+        chunk("过滤", 0.1, url="https://b.example"),
+    ])
+    assert [c.text for c in packed.chunks] == ["保留"]
+    assert packed.dropped == 1
+
+
+def test_empty_input():
+    packed = ContextBuilder().build([])
+    assert packed.chunks == []
+    assert packed.tokens == 0
+
+
+def test_prompt_labels_match_source_numbering():
+    from core.llm_handler import LLMHandler
+
+    class StubClient:
+        pass
+
+    handler = LLMHandler(llm_type="ollama", model_name="stub", client=StubClient())
+    handler.context_builder = ContextBuilder(token_budget=1000)
+    chunks = [
+        chunk("低分的独立文档内容", 0.2, url="https://b.example"),
+        chunk("高分的文档内容", 0.9, url="https://a.example"),
+    ]
+    sources = handler.sources_event(chunks)['sources']
+    prompt = handler._build_messages("问题", chunks)[1]['content']
+    # 按分数排序后，高分文档仍使用它在 sources 中的编号
+    assert sources[1]['url'] == "https://a.example"
+    assert "文档2：高分的文档内容" in prompt
+    assert "文档1：低分的独立文档内容" in prompt
@@ -0,0 +1,59 @@
+import threading
+
+from models.document import Chunk
+from models.query import SearchResult
+from utils.deduplicator import Deduplicator, SeenResults, canonicalize_url, hamming_distance, simhash
+
+
+def result(url, content):
+    return SearchResult(title="t", content=content, url=url)
+
+
+def test_canonicalize_url_drops_tracking_fragment_and_default_port():
+    assert canonicalize_url("HTTPS://Example.com:443/a/?utm_source=x&b=2&a=1#frag") == \
+        canonicalize_url("https://example.com/a?a=1&b=2")
+    assert canonicalize_url("https://example.com/a?id=1") != canonicalize_url("https://example.com/a?id=2")
+
+
+def test_dedup_results_across_batches_by_url_and_content():
+    dedup = Deduplicator()
+    seen = SeenResults()
+    first = dedup.dedup_results([result("https://a.example/x", "第一篇"), result("https://b.example/", "第二篇")], seen)
+    second = dedup.dedup_results([
+        result("https://a.example/x?utm_medium=feed", "改过的摘要"),
+        result("https://mirror.example/", "第二篇"),
+        result("https://c.example/", "第三篇"),
+    ], seen)
+    assert len(first) == 2
+    assert [r.url for r in second] == ["https://c.example/"]
+    assert dedup.stats()['results_removed'] == 2
+
+
+def test_dedup_chunks_drops_near_duplicates_by_simhash():
+    base = "Retrieval augmented generation combines a search engine with a large language model to answer questions"
+    near = base.replace("questions", "questions.")
+    other = "The weather in Beijing is sunny today with a light breeze from the north and clear skies all day long"
+    assert hamming_distance(simhash(base), simhash(near)) <= Deduplicator().max_distance
+    kept = Deduplicator().dedup_chunks([Chunk(text=base), Chunk(text=near), Chunk(text=other), Chunk(text=base)])
+    assert [c.text for c in kept] == [base, other]
+
+
+def test_concurrent_batches_keep_one_copy_and_exact_stats():
+    dedup = Deduplicator()
+    seen = SeenResults()
+    batch = [result(f"https://example.com/{i}", f"内容 {i}") for i in range(200)]
+    kept = []
+    lock = threading.Lock()
+
+    def run():
+        out = dedup.dedup_results(list(batch), seen)
+        with lock:
+            kept.extend(out)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(kept) == 200
+    assert dedup.stats()['results_removed'] == 7 * 200
@@ -0,0 +1,35 @@
+import time
+
+from models.document import Document
+from utils.metrics import MetricsRegistry, RequestTrace, record_fetch, record_processing
+
+
+def make_document(clean, chunk, chunks):
+    return Document(chunks=[None] * chunks, source_url="https://example.com", title="", timings={"clean": clean, "chunk": chunk})
+
+
+def test_fetch_span_covers_overlapping_batches_once():
+    trace = RequestTrace("q")
+    now = time.perf_counter()
+    record_fetch(trace, [(now - 0.3, now - 0.1), (now - 0.2, now)], results=20)
+    spans = [span for span in trace.spans if span['name'] == 'fetch']
+    assert len(spans) == 1
+    assert abs(spans[0]['seconds'] - 0.3) < 1e-6
+    assert spans[0]['sizes'] == {'results': 20, 'batches': 2}
+
+
+def test_no_fetch_span_without_fetched_batches():
+    trace = RequestTrace("q")
+    record_fetch(trace, [], results=10)
+    assert trace.spans == []
+
+
+def test_processing_spans_are_recorded_once_per_request():
+    registry = MetricsRegistry()
+    trace = RequestTrace("q", registry)
+    record_processing(trace, [make_document(0.1, 0.2, 3), make_document(0.3, 0.4, 2)])
+    trace.finish()
+    names = [span['name'] for span in trace.spans]
+    assert names == ['clean', 'chunk', 'total']
+    assert 'rag_stage_duration_seconds_count{stage="clean"} 1' in registry.render()
+    assert trace.spans[1]['sizes'] == {'chunks': 5}
@@ -0,0 +1,153 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from config.settings import FetchConfig
+from models.query import SearchResult
+from utils.page_fetcher import PageFetcher
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """本地桩服务：/big 返回超大页面，/pdf 返回非 HTML 类型，/slow 延迟返回并统计并发数"""
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith("/big"):
+            self._send("text/html", b"<p>" + b"x" * (2 * 1024 * 1024) + b"</p>")
+        elif self.path.startswith("/article"):
+            paragraphs = "".join(f"<p>第{i}段讲的是无关的背景内容，这里只是填充文字而已。</p>" for i in range(60))
+            self._send("text/html; charset=utf-8", (paragraphs + "<p>向量数据库 vector database 的索引结构。</p>").encode("utf-8"))
+        elif self.path.startswith("/pdf"):
+            self._send("application/pdf", b"%PDF-1.4")
+        elif self.path.startswith("/slow"):
+            with server.lock:
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+            try:
+                time.sleep(server.delay)
+                self._send("text/html; charset=utf-8", "<p>完整页面</p>".encode("utf-8"))
+            finally:
+                with server.lock:
+                    server.active -= 1
+        else:
+            self.send_error(404)
+
+    def _send(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.active = 0
+    httpd.peak = 0
+    httpd.delay = 0.2
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_fetcher(**overrides):
+    config = FetchConfig(PAGE_CACHE_ENABLED=False, **overrides)
+    return PageFetcher(config=config, session=requests.Session())
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_body_is_capped_at_max_bytes(server):
+    fetcher = make_fetcher(MAX_BYTES=4096)
+    page = fetcher.fetch(url(server, "/big"), time.monotonic() + 5)
+    assert page is not None
+    assert len(page.text) == 4096
+
+
+def test_disallowed_content_type_is_rejected(server):
+    fetcher = make_fetcher()
+    assert fetcher.fetch(url(server, "/pdf"), time.monotonic() + 5) is None
+
+
+def test_per_host_limit_bounds_concurrency(server):
+    fetcher = make_fetcher(PER_HOST_LIMIT=2, MAX_WORKERS=8)
+    results = [SearchResult(title=str(i), content="摘要", url=url(server, f"/slow/{i}")) for i in range(6)]
+    fetched = fetcher.fetch_results(results, deadline=5)
+    assert all(result.content != "摘要" for result in fetched)
+    assert server.peak == 2
+
+
+def test_pages_missing_the_deadline_fall_back_to_snippets(server):
+    server.delay = 2.0
+    fetcher = make_fetcher()
+    results = [
+        SearchResult(title="slow", content="慢页面的摘要", url=url(server, "/slow/late")),
+        SearchResult(title="pdf", content="PDF 的摘要", url=url(server, "/pdf")),
+    ]
+    start = time.monotonic()
+    fetched = fetcher.fetch_results(results, deadline=0.3)
+    assert time.monotonic() - start < 1.0
+    assert [result.content for result in fetched] == ["慢页面的摘要", "PDF 的摘要"]
+
+
+def test_read_timeout_is_bounded_by_deadline(server):
+    server.delay = 2.0
+    fetcher = make_fetcher(READ_TIMEOUT=30.0)
+    start = time.monotonic()
+    assert fetcher.fetch(url(server, "/slow/late"), time.monotonic() + 0.3) is None
+    # 工作线程本身也在截止时间附近返回，而不是等满 READ_TIMEOUT
+    assert time.monotonic() - start < 1.0
+
+
+def test_batches_share_an_absolute_deadline(server):
+    server.delay = 2.0
+    fetcher = make_fetcher()
+    deadline_at = time.monotonic() + 0.3
+    time.sleep(0.3)
+    results = [SearchResult(title="slow", content="摘要", url=url(server, "/slow/shared"))]
+    start = time.monotonic()
+    # 截止时间已过，后到的批次直接回退为摘要
+    assert [result.content for result in fetcher.fetch_results(results, deadline_at=deadline_at)] == ["摘要"]
+    assert time.monotonic() - start < 0.5
+
+
+def test_cached_pages_are_chunked_with_query_terms(server, tmp_path, monkeypatch):
+    from config.settings import ProcessingConfig
+    from core.document_processor import _process_result
+    from utils.chunk_manager import ChunkManager
+    from utils.text_cleaner import TextCleaner
+
+    monkeypatch.setattr(ProcessingConfig, "PREFER_QUERY_TERM_CHUNKS", True)
+    config = FetchConfig(PAGE_CACHE_PATH=str(tmp_path / "pages.sqlite3"))
+    fetcher = PageFetcher(config=config, session=requests.Session())
+    results = [SearchResult(title="a", content="摘要", url=url(server, "/article"))]
+
+    fetched = fetcher.fetch_results(results, deadline=5)[0]
+    cached = fetcher.fetch_results(results, deadline=5)[0]
+    assert fetcher.page_cache.stats()['hits'] == 1
+    assert fetched.clean_seconds > 0
+    assert cached.clean_seconds == 0.0
+    assert cached.content == fetched.content
+
+    # 页面缓存只保存清理后的文本，分块时仍然使用本次请求的查询词
+    document = _process_result(cached, TextCleaner(), ChunkManager(), ["向量数据库"])
+    assert any("向量数据库" in chunk.text for chunk in document.chunks)
+    plain = _process_result(cached, TextCleaner(), ChunkManager())
+    assert not any("向量数据库" in chunk.text for chunk in plain.chunks)
+    assert document.timings['chunk'] > 0
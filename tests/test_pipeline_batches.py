@@ -0,0 +1,49 @@
+import threading
+from types import SimpleNamespace
+
+from main import RAGSearch
+from models.query import SearchResult
+from utils.deduplicator import SeenResults
+
+
+def result(url, content="摘要"):
+    return SearchResult(title=url, content=content, url=url)
+
+
+def test_claim_fetches_skips_urls_claimed_by_other_batches():
+    seen = SeenResults()
+    first = seen.claim_fetches([result("https://a.example/x?utm_source=1"), result("https://b.example/")])
+    second = seen.claim_fetches([result("https://a.example/x"), result("https://c.example/")])
+    assert [r.url for r in first] == ["https://a.example/x?utm_source=1", "https://b.example/"]
+    assert [r.url for r in second] == ["https://c.example/"]
+
+
+class RecordingFetcher:
+    def __init__(self):
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def fetch_results(self, results, deadline_at=None):
+        with self.lock:
+            self.urls.extend(r.url for r in results)
+        return results
+
+
+class PassthroughProcessor:
+    def iter_documents(self, results, query, seen):
+        return iter(results)
+
+
+def test_batches_fetch_each_url_once():
+    fetcher = RecordingFetcher()
+    rag = SimpleNamespace(page_fetcher=fetcher, document_processor=PassthroughProcessor())
+    seen = SeenResults()
+    batches = [
+        [result("https://a.example/"), result("https://b.example/")],
+        [result("https://b.example/"), result("https://c.example/")],
+        [result("https://a.example/#top"), result("https://c.example/")],
+    ]
+    for batch in batches:
+        documents, window = RAGSearch.process_batch(rag, batch, "q", seen, fetch_deadline_at=0)
+        assert window is not None
+    assert fetcher.urls == ["https://a.example/", "https://b.example/", "https://c.example/"]
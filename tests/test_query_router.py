@@ -0,0 +1,44 @@
+import pytest
+
+from config.settings import ProcessingConfig
+from utils.query_router import ROUTE_DIRECT, ROUTE_EXPAND, ROUTE_NO_REWRITE, ROUTE_REWRITE, QueryRouter
+
+
+@pytest.fixture
+def router():
+    return QueryRouter(ProcessingConfig())
+
+
+@pytest.mark.parametrize("query", ["你好", "您好！", "谢谢~", "Hello", "hi!", "Thank you.", "who are you?"])
+def test_greetings_are_answered_directly(router, query):
+    assert router.route(query) == ROUTE_DIRECT
+
+
+@pytest.mark.parametrize("query", ["1+1", "3 * (4 + 5)", "2^10", "12 ÷ 4 = ?", "100-37=", "1.5 × 2"])
+def test_arithmetic_is_answered_directly(router, query):
+    assert router.route(query) == ROUTE_DIRECT
+
+
+@pytest.mark.parametrize("query", ["1984", "404", "12306", "3.14", "2024-01-01", "010-12345678"])
+def test_numbers_and_dates_are_searched(router, query):
+    assert router.route(query) == ROUTE_NO_REWRITE
+
+
+def test_direct_answers_can_be_disabled():
+    config = ProcessingConfig()
+    config.ROUTE_ALLOW_DIRECT_ANSWER = False
+    router = QueryRouter(config)
+    assert router.route("你好") == ROUTE_NO_REWRITE
+    assert router.route("1+1") == ROUTE_NO_REWRITE
+
+
+@pytest.mark.parametrize("query, route", [
+    ("", ROUTE_NO_REWRITE),
+    ("python asyncio", ROUTE_NO_REWRITE),
+    ("什么是向量数据库", ROUTE_REWRITE),
+    ("what is rust?", ROUTE_REWRITE),
+    ("python 和 go 的区别", ROUTE_EXPAND),
+    ("postgres vs mysql", ROUTE_EXPAND),
+])
+def test_search_routes(router, query, route):
+    assert router.route(query) == route
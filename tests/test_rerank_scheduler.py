@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from utils.rerank_scheduler import MicroBatchScheduler
+from utils.rerank_service import RerankService
+
+
+class GatedPredictor:
+    """记录每个批次的打分函数；gate 未打开时第一个批次阻塞，便于让后续请求排队"""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, pairs):
+        self.batches.append(list(pairs))
+        self.started.set()
+        self.gate.wait(5)
+        return [float(len(text)) for _, text in pairs]
+
+
+def pairs_of(*texts):
+    return [("q", text) for text in texts]
+
+
+def test_concurrent_requests_share_one_batch():
+    predictor = GatedPredictor()
+    scheduler = MicroBatchScheduler(predictor, max_batch_size=100, max_wait_ms=50)
+
+    first = scheduler.submit(pairs_of("a"))
+    assert predictor.started.wait(5)
+    # 第一个批次推理期间到达的请求在队列中等待，随后合并成一个批次
+    queued = [scheduler.submit(pairs_of("bb", "ccc")), scheduler.submit(pairs_of("dddd")), scheduler.submit([])]
+    assert scheduler.queue_depth == 3
+    predictor.gate.set()
+
+    assert first.result(5) == [1.0]
+    assert [future.result(5) for future in queued] == [[2.0, 3.0], [4.0], []]
+    assert [len(batch) for batch in predictor.batches] == [1, 3]
+    assert scheduler.stats() == {
+        'queue_depth': 0,
+        'max_queue_depth': 3,
+        'batches': 2,
+        'pairs_scored': 4,
+        'avg_batch_size': 2.0
+    }
+
+
+def test_batch_stops_growing_at_max_batch_size():
+    predictor = GatedPredictor()
+    scheduler = MicroBatchScheduler(predictor, max_batch_size=2, max_wait_ms=50)
+
+    first = scheduler.submit(pairs_of("a"))
+    assert predictor.started.wait(5)
+    queued = [scheduler.submit(pairs_of(text)) for text in ("b", "c", "d")]
+    predictor.gate.set()
+
+    assert first.result(5) == [1.0]
+    assert [future.result(5) for future in queued] == [[1.0]] * 3
+    assert [len(batch) for batch in predictor.batches] == [1, 2, 1]
+    assert scheduler.stats()['batches'] == 3
+
+
+def test_failed_batch_fails_every_request_in_it():
+    def predict(pairs):
+        raise RuntimeError("model unavailable")
+
+    scheduler = MicroBatchScheduler(predict, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        scheduler.predict(pairs_of("a"))
+    assert scheduler.stats()['batches'] == 0
+    assert scheduler.queue_depth == 0
+
+
+class FakeCrossEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        self.calls += 1
+        return [len(text) for _, text in pairs]
+
+
+def test_service_scores_through_scheduler_and_cache():
+    service = RerankService(cache_size=100)
+    service._model = FakeCrossEncoder()
+
+    assert service.score("q", ["aa", "b", "cccc"]) == [2.0, 1.0, 4.0]
+    assert service.score("q", ["b", "ddd"]) == [1.0, 3.0]
+    assert service.scheduler_stats()['pairs_scored'] == 4
+    assert service.cache_stats()['hits'] == 1
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from core.search_engine import SearchEngine
+from utils.cache import TTLCache
+
+
+class SearxHandler(BaseHTTPRequestHandler):
+    """本地 SearXNG 桩：查询以 slow 开头时延迟返回，以 empty 开头时返回空结果"""
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)['q'][0]
+        with self.server.lock:
+            self.server.hits[query] = self.server.hits.get(query, 0) + 1
+        if query.startswith("slow"):
+            time.sleep(self.server.delay)
+        results = [] if query.startswith("empty") else [
+            {'title': f"{query} {i}", 'content': f"{query} 内容 {i}", 'url': f"https://example.com/{query}/{i}"}
+            for i in range(3)
+        ]
+        body = json.dumps({'results': results}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SearxHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.hits = {}
+    httpd.delay = 2.0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def engine(server):
+    engine = SearchEngine()
+    engine.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    engine.cache = None
+    return engine
+
+
+def test_whole_stage_shares_one_deadline(engine):
+    start = time.perf_counter()
+    returned = [query for query, _, _ in engine.iter_search_many(["fast a", "slow b", "fast c"], deadline=0.5)]
+    assert time.perf_counter() - start < 1.0
+    assert sorted(returned) == ["fast a", "fast c"]
+
+
+def test_queued_searches_count_against_the_deadline(engine, monkeypatch):
+    monkeypatch.setattr(engine.config, "MAX_CONCURRENT_SEARCHES", 1)
+    start = time.perf_counter()
+    returned = [query for query, _, _ in engine.iter_search_many(["slow a", "fast b"], deadline=0.5)]
+    assert time.perf_counter() - start < 1.0
+    assert returned == []
+
+
+def test_abandoned_search_stops_near_the_deadline_without_retrying(engine, server):
+    start = time.perf_counter()
+    results, _ = engine._timed_search("slow x", deadline_at=time.perf_counter() + 0.3)
+    assert results == []
+    assert time.perf_counter() - start < 1.0
+    time.sleep(0.3)
+    assert server.hits["slow x"] == 1
+
+
+
+def test_empty_results_are_not_cached(engine, server):
+    engine.cache = TTLCache(max_entries=10, ttl=60, namespace="search-test")
+    assert engine.search("empty q") == []
+    assert engine.search("empty q") == []
+    assert server.hits["empty q"] == 2
+    assert len(engine.search("fast q")) == 3
+    assert len(engine.search("fast q")) == 3
+    assert server.hits["fast q"] == 1
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from utils.text_splitter import DEFAULT_SEPARATORS, RecursiveTextSplitter
+
+text_splitters = pytest.importorskip("langchain_text_splitters")
+
+WORDS = [
+    "Python", "is", "a", "language", "retrieval", "augmented", "generation",
+    "人工智能", "是", "计算机", "科学", "的", "一个", "分支", "检索", "增强",
+    "。", "！", "？", ".", "!", "?", "\n", "\n\n", " ",
+]
+
+
+def make_corpus(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(WORDS) + rng.choice(["", " "]) for _ in range(rng.randint(1, 400)))
+        for _ in range(count)
+    ]
+
+
+def langchain_splitter(chunk_size, chunk_overlap):
+    return text_splitters.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=DEFAULT_SEPARATORS
+    )
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(100, 20), (50, 0), (30, 10), (10, 9), (20, 20)])
+def test_matches_langchain_on_mixed_text(chunk_size, chunk_overlap):
+    native = RecursiveTextSplitter(chunk_size, chunk_overlap, DEFAULT_SEPARATORS)
+    reference = langchain_splitter(chunk_size, chunk_overlap)
+    for text in make_corpus(200):
+        assert native.split_text(text) == reference.split_text(text), repr(text)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    " ",
+    "\n\n\n",
+    "a" * 250,
+    "人工智能是计算机科学的一个分支" * 20,
+    "no-separators-here-just-one-very-long-token-" * 10,
+    "短句。" * 60,
+    "Mixed 中英文 text without sentence ends " * 12,
+])
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(100, 20), (10, 10), (7, 3)])
+def test_matches_langchain_on_edge_cases(text, chunk_size, chunk_overlap):
+    native = RecursiveTextSplitter(chunk_size, chunk_overlap, DEFAULT_SEPARATORS)
+    assert native.split_text(text) == langchain_splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+def test_empty_text_has_no_chunks():
+    assert RecursiveTextSplitter(100, 20).split_text("") == []
+
+
+def test_spans_point_into_original_text():
+    text = make_corpus(1, seed=3)[0]
+    for start, end in RecursiveTextSplitter(40, 10).iter_spans(text):
+        assert 0 <= start < end <= len(text)
+
+
+def test_overlap_larger_than_size_is_rejected_like_langchain():
+    with pytest.raises(ValueError):
+        RecursiveTextSplitter(10, 11)
+    with pytest.raises(ValueError):
+        langchain_splitter(10, 11)
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from config.settings import ModelConfig
+from models.document import Chunk
+from utils.cache import TTLCache, make_cache_key, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_fingerprint(chunks: Sequence[Chunk]) -> str:
+    """排序后的参考文档集合的指纹：来源与文本，按排名顺序，不含分数"""
+    digest = hashlib.sha1()
+    for chunk in chunks:
+        digest.update((chunk.source_url or "").encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(chunk.text.encode("utf-8"))
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """
+    LLM 回答缓存，键为 (规范化查询, 模型, 参考文档指纹, 提示词版本)。
+    缓存的是 sources 之后的流式事件，命中时按同样的事件顺序回放，
+    只有完整且没有错误的生成才会写入缓存
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        replay_rate: Optional[float] = None
+    ):
+        self.cache = TTLCache(
+            max_entries=max_entries or ModelConfig.ANSWER_CACHE_SIZE,
+            ttl=ModelConfig.ANSWER_CACHE_TTL if ttl is None else ttl,
+            max_bytes=max_bytes or ModelConfig.ANSWER_CACHE_MAX_BYTES,
+            disk_path=disk_path or ModelConfig.ANSWER_CACHE_DB_PATH,
+            namespace="answer"
+        )
+        self.replay_rate = ModelConfig.ANSWER_REPLAY_RATE if replay_rate is None else replay_rate
+
+    def key(self, query: str, llm_type: str, model_name: Optional[str], chunks: Sequence[Chunk]) -> str:
+        # GPT 客户端的模型固定在 GPT4Client 中，与 ClientRegistry 的规则一致
+        model = None if llm_type == "gpt" else model_name
+        return make_cache_key(
+            normalize_query(query),
+            llm_type,
+            model,
+            chunk_fingerprint(chunks),
+            ModelConfig.PROMPT_VERSION,
+            ModelConfig.CONTEXT_TOKEN_BUDGET
+        )
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        return self.cache.get(key)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    @staticmethod
+    def _is_content(event: Dict) -> bool:
+        return isinstance(event.get('content'), str) and bool(event['content'])
+
+    def _store(self, key: str, events: List[Dict]):
+        if any(self._is_content(event) for event in events):
+            self.cache.set(key, events)
+
+    def record(self, key: str, stream: Iterator[Dict]) -> Iterator[Dict]:
+        """
+        透传生成事件并记录 sources 之后的事件，生成正常结束且没有错误时写入缓存；
+        客户端中途断开时生成器被关闭，不会写入
+        """
+        events = []
+        failed = False
+        for event in stream:
+            if 'error' in event:
+                failed = True
+            elif 'sources' not in event:
+                events.append(event)
+            yield event
+        if not failed:
+            self._store(key, events)
+
+    async def arecord(self, key: str, stream: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        """record 的异步版本"""
+        events = []
+        failed = False
+        async for event in stream:
+            if 'error' in event:
+                failed = True
+            elif 'sources' not in event:
+                events.append(event)
+            yield event
+        if not failed:
+            self._store(key, events)
+
+    def replay(self, sources: Dict, events: List[Dict]) -> Iterator[Dict]:
+        """先产出 sources，再回放缓存的事件，replay_rate > 0 时按该速率输出内容事件"""
+        yield sources
+        interval = 1.0 / self.replay_rate if self.replay_rate > 0 else 0.0
+        for event in events:
+            if interval and self._is_content(event):
+                time.sleep(interval)
+            yield event
+
+    async def areplay(self, sources: Dict, events: List[Dict]) -> AsyncIterator[Dict]:
+        """replay 的异步版本"""
+        yield sources
+        interval = 1.0 / self.replay_rate if self.replay_rate > 0 else 0.0
+        for event in events:
+            if interval and self._is_content(event):
+                await asyncio.sleep(interval)
+            yield event
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """
+    规范化查询文本：全角转半角（NFKC）、转小写、合并空白
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """将若干可 JSON 序列化的部分组合成稳定的缓存键"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SqliteStore:
+    """基于 sqlite 的持久化缓存层，值以 JSON 文本存储"""
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL, PRIMARY KEY (namespace, key))"
+            )
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """返回 (value, expires_at)，不存在或已过期时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        return json.loads(value), expires_at
+
+    def set(self, key: str, value: Any, expires_at: Optional[float]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            )
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at < ?",
+                (self.namespace, time.time())
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+
+class TTLCache:
+    """
+    线程安全的内存 LRU + TTL 缓存，可选 sqlite 持久化层
+
+    值必须可 JSON 序列化，内存占用按序列化后的长度估算。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 3600,
+        max_bytes: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        namespace: str = "default"
+    ):
+        """
+        Args:
+            max_entries: 内存中最多保留的条目数
+            ttl: 过期时间（秒），None 表示不过期
+            max_bytes: 内存占用上限（字节），None 表示不限制
+            disk_path: sqlite 文件路径，None 表示不启用持久化层
+            namespace: 持久化层中的命名空间，多个缓存可共用同一个文件
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path:
+            try:
+                self._disk = SqliteStore(disk_path, namespace)
+            except Exception as e:
+                logger.error(f"Failed to open disk cache {disk_path}: {str(e)}")
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at is None or expires_at >= now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        if self._disk is not None:
+            try:
+                row = self._disk.get(key)
+            except Exception as e:
+                logger.error(f"Disk cache read failed: {str(e)}")
+                row = None
+            if row is not None:
+                value, expires_at = row
+                with self._lock:
+                    self.disk_hits += 1
+                    self._put(key, value, expires_at)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        expires_at = self._expires_at(time.time())
+        with self._lock:
+            self._put(key, value, expires_at)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, value, expires_at)
+            except Exception as e:
+                logger.error(f"Disk cache write failed: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.ttl if self.ttl is not None else None
+
+    def _put(self, key: str, value: Any, expires_at: Optional[float]):
+        """写入内存层，调用方需持有锁"""
+        if key in self._data:
+            self._remove(key)
+        size = len(json.dumps(value, ensure_ascii=False)) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        """从内存层移除，调用方需持有锁"""
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
@@ -1,53 +1,129 @@
-from typing import List
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import heapq
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 from config.settings import ProcessingConfig
+from utils.text_splitter import RecursiveTextSplitter, DEFAULT_SEPARATORS
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (块文本, 在清理后文本中的起始偏移, 结束偏移)
+ChunkSpan = Tuple[str, int, int]
+
 class ChunkManager:
     def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=ProcessingConfig.CHUNK_SIZE,
-            chunk_overlap=ProcessingConfig.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]
-        )
+        if ProcessingConfig.CHUNKER == "langchain":
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=ProcessingConfig.CHUNK_SIZE,
+                chunk_overlap=ProcessingConfig.CHUNK_OVERLAP,
+                length_function=len,
+                separators=DEFAULT_SEPARATORS
+            )
+        else:
+            self.text_splitter = RecursiveTextSplitter(
+                chunk_size=ProcessingConfig.CHUNK_SIZE,
+                chunk_overlap=ProcessingConfig.CHUNK_OVERLAP,
+                separators=DEFAULT_SEPARATORS
+            )
+
+    def iter_chunk_spans(self, text: str, limit: Optional[int] = None) -> Iterator[ChunkSpan]:
+        """
+        惰性分块，产出 (块文本, start, end)，达到数量上限后立即停止分块
         
-    def create_chunks(self, text: str) -> List[str]:
+        Args:
+            text: 输入文本
+            limit: 最多产出的块数，默认 MAX_CHUNKS_PER_DOC
+        """
+        if not text:
+            return
+        if len(text) < ProcessingConfig.MIN_CHUNK_LENGTH:
+            yield text, 0, len(text)
+            return
+
+        limit = limit or ProcessingConfig.MAX_CHUNKS_PER_DOC
+        count = 0
+        for start, end in self._iter_spans(text):
+            # 过滤掉太短的块
+            if end - start < ProcessingConfig.MIN_CHUNK_LENGTH:
+                continue
+            yield text[start:end], start, end
+            count += 1
+            # 限制每个文档的最大块数
+            if count >= limit:
+                return
+
+    def create_chunk_spans(self, text: str) -> List[ChunkSpan]:
         """
-        使用 Langchain 的 RecursiveCharacterTextSplitter 进行文本分块
+        分块并返回每个块在原文中的偏移，达到 MAX_CHUNKS_PER_DOC 后立即停止
         
         Args:
             text: 输入文本
             
         Returns:
-            分块后的文本列表
+            (块文本, start, end) 列表
         """
         try:
-            if not text:
-                return []
-            if len(text) < ProcessingConfig.MIN_CHUNK_LENGTH:
-                return [text]
-                
-            chunks = self.text_splitter.split_text(text)
-            
-            # 过滤掉太短的块
-            valid_chunks = [
-                chunk for chunk in chunks 
-                if len(chunk) >= ProcessingConfig.MIN_CHUNK_LENGTH
-            ]
-            
-            # 限制每个文档的最大块数
-            if len(valid_chunks) > ProcessingConfig.MAX_CHUNKS_PER_DOC:
-                logger.warning(f"Truncating chunks from {len(valid_chunks)} to {ProcessingConfig.MAX_CHUNKS_PER_DOC}")
-                valid_chunks = valid_chunks[:ProcessingConfig.MAX_CHUNKS_PER_DOC]
-                
-            return valid_chunks
-            
+            return list(self.iter_chunk_spans(text))
         except Exception as e:
             logger.error(f"Error creating chunks: {str(e)}")
             return []
+
+    def _iter_spans(self, text: str):
+        if isinstance(self.text_splitter, RecursiveTextSplitter):
+            yield from self.text_splitter.iter_spans(text)
+            return
+        # LangChain 不返回偏移，按顺序在原文中查找
+        position = 0
+        for chunk in self.text_splitter.split_text(text):
+            start = text.find(chunk, position)
+            if start == -1:
+                start = position
+            yield start, start + len(chunk)
+            position = start + 1
+        
+    def create_chunks(self, text: str) -> List[str]:
+        """
+        对文本进行分块
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            分块后的文本列表
+        """
+        return [chunk for chunk, _, _ in self.create_chunk_spans(text)]
+
+    def iter_merge_small_chunks(self, chunks: Iterable[ChunkSpan], min_size: int) -> Iterator[ChunkSpan]:
+        """
+        惰性合并过小的文本块，合并后的偏移覆盖所有被合并的块
+        """
+        parts: List[str] = []
+        length = 0
+        start = end = 0
+
+        for text, chunk_start, chunk_end in chunks:
+            if not parts:
+                parts = [text]
+                length = len(text)
+                start, end = chunk_start, chunk_end
+            elif length < min_size:
+                parts.append(text)
+                length += 1 + len(text)
+                end = chunk_end
+            else:
+                yield " ".join(parts), start, end
+                parts = [text]
+                length = len(text)
+                start, end = chunk_start, chunk_end
+
+        if parts and (len(parts) > 1 or parts[0]):
+            yield " ".join(parts), start, end
+
+    def merge_small_span_chunks(self, chunks: List[ChunkSpan], min_size: int) -> List[ChunkSpan]:
+        """
+        合并过小的文本块，合并后的偏移覆盖所有被合并的块
+        """
+        return list(self.iter_merge_small_chunks(chunks, min_size))
             
     def merge_small_chunks(self, chunks: List[str], min_size: int) -> List[str]:
         """
@@ -60,23 +136,47 @@ class ChunkManager:
         Returns:
             合并后的文本块列表
         """
-        if not chunks:
+        spans = [(chunk, 0, 0) for chunk in chunks]
+        return [chunk for chunk, _, _ in self.merge_small_span_chunks(spans, min_size)]
+
+    def iter_split_and_merge(self, text: str, query_terms: Optional[Sequence[str]] = None) -> Iterator[ChunkSpan]:
+        """
+        惰性分块并合并过小的块
+
+        Args:
+            text: 输入文本
+            query_terms: 查询词，提供时在前 MAX_CHUNKS_PER_DOC * CHUNK_SCAN_FACTOR 个候选块中
+                优先保留命中查询词最多的块（保持原文顺序）
+        """
+        if query_terms:
+            spans = self._select_by_query_terms(text, query_terms)
+        else:
+            spans = self.iter_chunk_spans(text)
+        return self.iter_merge_small_chunks(spans, ProcessingConfig.MIN_CHUNK_LENGTH)
+
+    def _select_by_query_terms(self, text: str, query_terms: Sequence[str]) -> List[ChunkSpan]:
+        limit = ProcessingConfig.MAX_CHUNKS_PER_DOC
+        candidates = list(self.iter_chunk_spans(text, limit * ProcessingConfig.CHUNK_SCAN_FACTOR))
+        if len(candidates) <= limit:
+            return candidates
+
+        def hits(index: int) -> int:
+            chunk = candidates[index][0].lower()
+            return sum(1 for term in query_terms if term in chunk)
+
+        # 命中数相同时保留靠前的块
+        keep = heapq.nlargest(limit, range(len(candidates)), key=lambda i: (hits(i), -i))
+        return [candidates[i] for i in sorted(keep)]
+
+    def split_and_merge_with_offsets(self, text: str, query_terms: Optional[Sequence[str]] = None) -> List[ChunkSpan]:
+        """
+        分块并合并过小的块，同时返回每个块在原文中的偏移
+        """
+        try:
+            return list(self.iter_split_and_merge(text, query_terms))
+        except Exception as e:
+            logger.error(f"Error creating chunks: {str(e)}")
             return []
-            
-        merged = []
-        current_chunk = chunks[0]
-        
-        for chunk in chunks[1:]:
-            if len(current_chunk) < min_size:
-                current_chunk = current_chunk + " " + chunk
-            else:
-                merged.append(current_chunk)
-                current_chunk = chunk
-                
-        if current_chunk:
-            merged.append(current_chunk)
-            
-        return merged
         
     def split_and_merge(self, text: str) -> List[str]:
         """
@@ -88,5 +188,4 @@ class ChunkManager:
         Returns:
             处理后的文本块列表
         """
-        chunks = self.create_chunks(text)
-        return self.merge_small_chunks(chunks, ProcessingConfig.MIN_CHUNK_LENGTH) 
\ No newline at end of file
+        return [chunk for chunk, _, _ in self.split_and_merge_with_offsets(text)]
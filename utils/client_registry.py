@@ -0,0 +1,78 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from config.settings import OllamaConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    线程安全的 LLM 客户端注册表，按 (llm_type, model) 复用客户端及其底层 HTTP 连接池，
+    每个请求通过 get_handler 获得自己的 LLMHandler
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, Optional[str]], object] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(llm_type: str, model_name: Optional[str]) -> Tuple[str, Optional[str]]:
+        if llm_type == "gpt":
+            # GPT 客户端的模型固定在 GPT4Client 中
+            return "gpt", None
+        if not model_name:
+            raise ValueError("model_name is required when using ollama client")
+        return "ollama", model_name
+
+    def _create_client(self, llm_type: str):
+        if llm_type == "gpt":
+            from utils.gpt4_client import GPT4Client
+            return GPT4Client()
+        from utils.ollama_client import OllamaClient
+        return OllamaClient()
+
+    def get_client(self, llm_type: str, model_name: Optional[str] = None):
+        """
+        获取 (llm_type, model) 对应的客户端，同类型的客户端共享同一个底层实例
+
+        Args:
+            llm_type: "gpt" 或 "ollama"
+            model_name: Ollama 模型名称
+        """
+        key = self._normalize(llm_type, model_name)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # 同类型的其他模型已创建过客户端时直接复用，共享连接池
+                client = next((c for (t, _), c in self._clients.items() if t == key[0]), None)
+                if client is None:
+                    client = self._create_client(key[0])
+                self._clients[key] = client
+            return client
+
+    def get_handler(self, llm_type: str, model_name: Optional[str] = None):
+        """为单个请求创建 LLMHandler，复用已注册的客户端"""
+        from core.llm_handler import LLMHandler
+        client = self.get_client(llm_type, model_name)
+        return LLMHandler(llm_type=llm_type, model_name=model_name, client=client)
+
+    def warm_up(self, specs: Optional[Iterable[Tuple[str, Optional[str]]]] = None):
+        """
+        启动时预先创建客户端并建立连接，失败只记录日志
+
+        Args:
+            specs: (llm_type, model) 列表，默认 GPT 与 Ollama 默认模型
+        """
+        specs = specs or [("gpt", None), ("ollama", OllamaConfig.DEFAULT_MODEL)]
+        for llm_type, model_name in specs:
+            try:
+                client = self.get_client(llm_type, model_name)
+                if hasattr(client, "test_connection"):
+                    client.test_connection()
+                if llm_type == "ollama" and OllamaConfig.PRELOAD_DEFAULT_MODEL:
+                    client.preload(model_name)
+                logger.info(f"Warmed up {llm_type} client for {model_name or 'default model'}")
+            except Exception as e:
+                logger.warning(f"Warm-up of {llm_type} client failed: {str(e)}")
@@ -0,0 +1,241 @@
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
+
+from config.settings import ModelConfig
+from models.document import Chunk
+
+logger = logging.getLogger(__name__)
+
+_CJK_RE = re.compile(r'[一-鿿]')
+_WORD_RE = re.compile(r'[^\W一-鿿]+')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def load_tokenizer():
+    """
+    加载服务模型的分词器（transformers，ModelConfig.CONTEXT_TOKENIZER），只加载一次。
+    启动预热时调用，避免首个请求承担加载和下载时间；未配置或加载失败时记录一次日志并改用估算
+    """
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if _tokenizer_loaded:
+            return _tokenizer
+        name = ModelConfig.CONTEXT_TOKENIZER
+        if name:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(
+                    name,
+                    local_files_only=ModelConfig.CONTEXT_TOKENIZER_LOCAL_ONLY
+                )
+                logger.info(f"Loaded context tokenizer {name}")
+            except Exception as e:
+                logger.warning(f"Failed to load context tokenizer {name}, using heuristic token counts: {str(e)}")
+                _tokenizer = None
+        else:
+            logger.warning("CONTEXT_TOKENIZER is not set, using heuristic token counts")
+        _tokenizer_loaded = True
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """
+    统计 token 数：优先使用服务模型的分词器，否则按
+    每个中日韩字符 1 个、每个英文/数字词每 4 个字符 1 个、每个标点 1 个估算
+    """
+    if not text:
+        return 0
+    tokenizer = _tokenizer if _tokenizer_loaded else load_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    cjk = len(_CJK_RE.findall(text))
+    words = sum(math.ceil(len(word) / 4) for word in _WORD_RE.findall(text))
+    punct = len(_PUNCT_RE.findall(text))
+    return cjk + words + punct
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """left 的后缀与 right 的前缀的最长重叠长度，小于 min_overlap 时返回 0"""
+    for size in range(min(len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _span(chunk: Chunk):
+    metadata = chunk.metadata or {}
+    start, end = metadata.get('start'), metadata.get('end')
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def _with_sources(metadata: Optional[dict], other: Optional[dict]) -> dict:
+    """复制 metadata，并并入 other 的 source_indices"""
+    merged = dict(metadata or {})
+    indices = set(merged.get('source_indices', [])) | set((other or {}).get('source_indices', []))
+    if indices:
+        merged['source_indices'] = sorted(indices)
+    return merged
+
+
+@dataclass
+class PackedContext:
+    """
+    打包后的上下文：保留的块（已合并），以及统计信息。
+    每个块的 metadata['source_indices'] 是它覆盖的输入块下标，用于在提示中按 sources 事件的编号引用
+    """
+    chunks: List[Chunk]
+    tokens: int = 0  # 上下文块的 token 总数
+    merged: int = 0  # 被合并进相邻块的块数
+    dropped: int = 0  # 因冗余或超出预算被丢弃的块数
+    truncated: bool = False  # 最高分的块本身超出预算时被截断
+
+
+class ContextBuilder:
+    """
+    在 token 预算内打包参考文档：
+    1. 合并同一页面中重叠或相邻的块（有偏移量时按偏移判断，否则按后缀/前缀重叠判断）
+    2. 丢弃被其他块完整包含的冗余块
+    3. 按分数从高到低装入，超出预算的低分块被丢弃
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        min_overlap: Optional[int] = None,
+        min_score: Optional[float] = None
+    ):
+        self.token_budget = ModelConfig.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+        self.min_overlap = ModelConfig.CONTEXT_MIN_OVERLAP if min_overlap is None else min_overlap
+        self.min_score = ModelConfig.CONTEXT_MIN_SCORE if min_score is None else min_score
+
+    def _join(self, first: Chunk, second: Chunk, adjacent: bool) -> Optional[Chunk]:
+        """合并两个块，first 在页面中位于 second 之前；无法合并时返回 None"""
+        if second.text in first.text:
+            text = first.text
+        else:
+            size = _overlap(first.text, second.text, self.min_overlap)
+            if size:
+                text = first.text + second.text[size:]
+            elif adjacent:
+                text = f"{first.text} {second.text}"
+            else:
+                return None
+
+        metadata = _with_sources(first.metadata, second.metadata)
+        first_span, second_span = _span(first), _span(second)
+        if first_span and second_span:
+            metadata['start'] = min(first_span[0], second_span[0])
+            metadata['end'] = max(first_span[1], second_span[1])
+        scores = [score for score in (first.score, second.score) if score is not None]
+        return replace(first, text=text, metadata=metadata, score=max(scores) if scores else None)
+
+    def _merge_source(self, chunks: List[Chunk]) -> List[Chunk]:
+        """合并同一来源的块，返回合并后的块"""
+        if len(chunks) == 1:
+            return chunks
+        if all(_span(chunk) for chunk in chunks):
+            # 按页面位置排序，偏移重叠或首尾相接的块合并
+            ordered = sorted(chunks, key=lambda chunk: _span(chunk))
+            merged = [ordered[0]]
+            for chunk in ordered[1:]:
+                previous = merged[-1]
+                joined = None
+                if _span(chunk)[0] <= _span(previous)[1] + 1:
+                    joined = self._join(previous, chunk, adjacent=True)
+                if joined is not None:
+                    merged[-1] = joined
+                else:
+                    merged.append(chunk)
+            return merged
+
+        # 没有偏移量：按文本的后缀/前缀重叠两两合并
+        merged = list(chunks)
+        changed = True
+        while changed and len(merged) > 1:
+            changed = False
+            for i in range(len(merged)):
+                for j in range(len(merged)):
+                    if i == j:
+                        continue
+                    joined = self._join(merged[i], merged[j], adjacent=False)
+                    if joined is not None:
+                        merged[i] = joined
+                        del merged[j]
+                        changed = True
+                        break
+                if changed:
+                    break
+        return merged
+
+    def merge(self, chunks: Sequence[Chunk]) -> List[Chunk]:
+        """按来源分组合并，结果按分数从高到低排列"""
+        groups: Dict[str, List[Chunk]] = {}
+        for chunk in chunks:
+            groups.setdefault(chunk.source_url or f"#{id(chunk)}", []).append(chunk)
+        merged = [chunk for group in groups.values() for chunk in self._merge_source(group)]
+        return sorted(merged, key=lambda chunk: chunk.score if chunk.score is not None else -float('inf'), reverse=True)
+
+    def _truncate(self, chunk: Chunk, budget: int) -> Chunk:
+        """把单个块截断到预算以内，按 token 比例估算截断位置"""
+        text = chunk.text
+        while text and count_tokens(text) > budget:
+            text = text[:max(1, int(len(text) * budget / count_tokens(text) * 0.95))]
+        return replace(chunk, text=text)
+
+    def build(self, chunks: Sequence[Chunk]) -> PackedContext:
+        """打包参考文档，返回在预算内的块"""
+        if not chunks:
+            return PackedContext(chunks=[])
+
+        # 记录每个块在输入中的下标，合并后仍能对应到原始编号
+        candidates = [
+            replace(chunk, metadata={**(chunk.metadata or {}), 'source_indices': [i]})
+            for i, chunk in enumerate(chunks)
+            if self.min_score is None or chunk.score is None or chunk.score >= self.min_score
+        ]
+        dropped = len(chunks) - len(candidates)
+        merged = self.merge(candidates)
+        merged_count = len(candidates) - len(merged)
+
+        kept: List[Chunk] = []
+        total = 0
+        truncated = False
+        for chunk in merged:
+            # 内容已被更高分的块包含，由包含它的块一并引用
+            container = next((i for i, other in enumerate(kept) if chunk.text in other.text), None)
+            if container is not None:
+                kept[container] = replace(
+                    kept[container],
+                    metadata=_with_sources(kept[container].metadata, chunk.metadata)
+                )
+                dropped += 1
+                continue
+            tokens = count_tokens(chunk.text)
+            if total + tokens > self.token_budget:
+                if not kept and self.token_budget > 0:
+                    chunk = self._truncate(chunk, self.token_budget)
+                    tokens = count_tokens(chunk.text)
+                    truncated = True
+                else:
+                    dropped += 1
+                    continue
+            kept.append(chunk)
+            total += tokens
+
+        return PackedContext(
+            chunks=kept,
+            tokens=total,
+            merged=merged_count,
+            dropped=dropped,
+            truncated=truncated
+        )
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import threading
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config.settings import ProcessingConfig
+from models.document import Chunk
+from models.query import SearchResult
+from utils.cache import normalize_query
+from utils.retriever import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 不影响页面内容的跟踪参数
+_TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+    'spm', 'ref', 'ref_src', 'from', 'share_source', '_ga', 'igshid'
+}
+_TRACKING_PREFIXES = ('utm_',)
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化 URL：小写协议和主机名、去掉 www 和默认端口、去掉跟踪参数与锚点、参数排序
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith(_TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(params)), ""))
+
+
+def content_fingerprint(text: str) -> Optional[str]:
+    """规范化后内容的指纹，空内容返回 None"""
+    normalized = normalize_query(text)
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """基于分词结果的 SimHash 指纹，用于近似重复检测"""
+    weights = [0] * bits
+    for token in tokenize(text):
+        h = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:bits // 8], "big")
+        for i in range(bits):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    value = 0
+    for i, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << i
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SeenResults:
+    """跨批次共享的去重状态，流水线中逐批处理搜索结果时使用，多个批次可以在不同线程中并发更新"""
+
+    def __init__(self):
+        self.urls = set()
+        self.content = set()
+        self.fetching = set()  # 已由某个批次负责抓取的规范化 URL
+        self.lock = threading.Lock()
+
+    def claim_fetches(self, results: List[SearchResult]) -> List[SearchResult]:
+        """
+        抓取完整页面之前调用：去掉已由其他批次抓取或已处理过的 URL，其余 URL 记为由当前批次抓取，
+        避免多个改写查询返回的同一页面被重复下载
+        """
+        kept = []
+        with self.lock:
+            for result in results:
+                key = canonicalize_url(result.url)
+                if key and (key in self.fetching or key in self.urls):
+                    continue
+                if key:
+                    self.fetching.add(key)
+                kept.append(result)
+        return kept
+
+
+class Deduplicator:
+    """
+    搜索结果与文本块去重：按规范化 URL 和内容指纹去掉重复结果，按 SimHash 去掉近似重复块
+    """
+
+    def __init__(self, max_distance: Optional[int] = None):
+        """
+        Args:
+            max_distance: SimHash 汉明距离阈值，不超过该值视为近似重复
+        """
+        self.max_distance = ProcessingConfig.SIMHASH_MAX_DISTANCE if max_distance is None else max_distance
+        # 所有请求共享同一个去重器，并发批次更新统计时需要加锁
+        self.results_removed = 0
+        self.chunks_removed = 0
+        self._stats_lock = threading.Lock()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {'results_removed': self.results_removed, 'chunks_removed': self.chunks_removed}
+
+    def dedup_results(self, results: List[SearchResult], seen: Optional[SeenResults] = None) -> List[SearchResult]:
+        """
+        去掉 URL 或内容重复的搜索结果，保留首次出现的结果
+
+        Args:
+            results: 搜索结果
+            seen: 之前批次的去重状态，会被就地更新；None 表示只在本批次内去重
+        """
+        if seen is None:
+            seen = SeenResults()
+        seen_urls = seen.urls
+        seen_content = seen.content
+        keys = [(canonicalize_url(result.url), content_fingerprint(result.content)) for result in results]
+        kept = []
+        with seen.lock:
+            for result, (url_key, content_key) in zip(results, keys):
+                if (url_key and url_key in seen_urls) or (content_key and content_key in seen_content):
+                    continue
+                if url_key:
+                    seen_urls.add(url_key)
+                if content_key:
+                    seen_content.add(content_key)
+                kept.append(result)
+
+        removed = len(results) - len(kept)
+        with self._stats_lock:
+            self.results_removed += removed
+        if removed:
+            logger.info(f"Removed {removed} duplicate search results ({len(kept)} left)")
+        return kept
+
+    def dedup_chunks(self, chunks: List[Chunk]) -> List[Chunk]:
+        """
+        去掉完全相同或 SimHash 近似重复的文本块，保留首次出现的块
+        """
+        seen_content = set()
+        fingerprints: List[int] = []
+        kept = []
+        for chunk in chunks:
+            content_key = content_fingerprint(chunk.text)
+            if content_key in seen_content:
+                continue
+            fingerprint = simhash(chunk.text)
+            if any(hamming_distance(fingerprint, other) <= self.max_distance for other in fingerprints):
+                continue
+            seen_content.add(content_key)
+            fingerprints.append(fingerprint)
+            kept.append(chunk)
+
+        removed = len(chunks) - len(kept)
+        with self._stats_lock:
+            self.chunks_removed += removed
+        if removed:
+            logger.info(f"Removed {removed} duplicate chunks ({len(kept)} left)")
+        return kept
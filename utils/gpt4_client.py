@@ -1,8 +1,7 @@
-from openai import AzureOpenAI
 import logging
 import os
 import sys
-from typing import Optional, List, Dict, Any, Generator
+from typing import Optional, List, Dict, Any, AsyncGenerator, Generator
 import json
 
 logger = logging.getLogger(__name__)
@@ -22,12 +21,33 @@ azure_endpoint = os.getenv("gpt4o_mini_azure_endpoint")
 
 class GPT4Client:
     def __init__(self):
-        self.client = AzureOpenAI(
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=azure_endpoint
-        )
         self.model_name = 'gpt-4o-mini'
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self):
+        """同步客户端，首次使用时创建，避免启动时导入 openai"""
+        if self._client is None:
+            from openai import AzureOpenAI
+            self._client = AzureOpenAI(
+                api_key=api_key,
+                api_version=api_version,
+                azure_endpoint=azure_endpoint
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        """异步客户端，首次使用时创建（ASGI 模式下使用）"""
+        if self._async_client is None:
+            from openai import AsyncAzureOpenAI
+            self._async_client = AsyncAzureOpenAI(
+                api_key=api_key,
+                api_version=api_version,
+                azure_endpoint=azure_endpoint
+            )
+        return self._async_client
         
     def get_completion_stream(
         self,
@@ -61,8 +81,43 @@ class GPT4Client:
                     yield chunk.choices[0].delta.content
                     
         except Exception as e:
+            # 抛出异常而不是把错误当作回答内容输出，调用方据此产出 error 事件
             logger.error(f"GPT-4 API stream call failed: {str(e)}")
-            yield f"Error: {str(e)}"
+            raise
+
+    async def get_completion_stream_async(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 1000,
+        temperature: float = 0.5,
+        top_p: float = 0.95,
+        frequency_penalty: float = 0,
+        presence_penalty: float = 0,
+        stop: Optional[List[str]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        获取 GPT-4 异步流式响应
+        """
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+                frequency_penalty=frequency_penalty,
+                presence_penalty=presence_penalty,
+                stop=stop,
+                stream=True
+            )
+
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            logger.error(f"GPT-4 API async stream call failed: {str(e)}")
+            raise
 
     def get_completion(
         self,
@@ -79,6 +134,20 @@ class GPT4Client:
             logger.error(f"GPT-4 API call failed: {str(e)}")
             return None
             
+    async def get_completion_async(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> Optional[str]:
+        """
+        异步获取完整响应
+        """
+        try:
+            return "".join([chunk async for chunk in self.get_completion_stream_async(messages, **kwargs)])
+        except Exception as e:
+            logger.error(f"GPT-4 API async call failed: {str(e)}")
+            return None
+            
     def get_structured_response(
         self,
         messages: List[Dict[str, str]],
@@ -99,6 +168,23 @@ class GPT4Client:
             清理后的响应列表
         """
         response = self.get_completion(messages, **kwargs)
+        return self._structure(response, split_lines, remove_prefixes)
+
+    async def get_structured_response_async(
+        self,
+        messages: List[Dict[str, str]],
+        split_lines: bool = True,
+        remove_prefixes: bool = True,
+        **kwargs
+    ) -> List[str]:
+        """
+        get_structured_response 的异步版本
+        """
+        response = await self.get_completion_async(messages, **kwargs)
+        return self._structure(response, split_lines, remove_prefixes)
+
+    @staticmethod
+    def _structure(response: Optional[str], split_lines: bool, remove_prefixes: bool) -> List[str]:
         if not response:
             return []
             
@@ -0,0 +1,51 @@
+import threading
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_sessions: Dict[Tuple, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def get_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    max_retries: int = 2,
+    backoff_factor: float = 0.3
+) -> requests.Session:
+    """
+    获取共享的 keep-alive HTTP 会话，相同配置的调用方复用同一个连接池
+
+    Args:
+        pool_connections: 缓存的主机连接池数量
+        pool_maxsize: 每个主机连接池的最大连接数
+        max_retries: 连接失败或 5xx 时的最大重试次数
+        backoff_factor: 重试的指数退避因子（秒）
+
+    Returns:
+        配置好连接池和重试策略的 requests.Session
+    """
+    key = (pool_connections, pool_maxsize, max_retries, backoff_factor)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            # POST 不在 allowed_methods 中，只会在连接建立失败时重试，避免重复生成
+            retry = Retry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+        return session
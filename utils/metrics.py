@@ -0,0 +1,274 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import LogConfig
+
+logger = logging.getLogger(__name__)
+
+# 阶段耗时的直方图桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 阶段数据量（结果数、块数、字符数、token 数）的直方图桶
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    """带标签的累积直方图，输出 Prometheus 文本格式"""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.label_names = tuple(label_names)
+        # 标签值 -> [各桶计数, 总和, 总数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    汇总每个请求的阶段耗时和数据量，并把各组件的统计（缓存、重排序调度、去重）
+    以 Prometheus 文本格式输出，供 /metrics 接口使用
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "rag_stage_duration_seconds", "Per-request stage latency in seconds.",
+            LATENCY_BUCKETS, ("stage",)
+        )
+        self.stage_size = Histogram(
+            "rag_stage_size", "Per-request stage sizes (results, chunks, characters, tokens).",
+            SIZE_BUCKETS, ("stage", "measure")
+        )
+        self.requests = 0
+        self.errors = 0
+        self._collectors: List[Tuple[str, Callable[[], Dict]]] = []
+        self._lock = threading.Lock()
+
+    def register_collector(self, component: str, collect: Callable[[], Dict]):
+        """注册组件统计的回调，每次输出 /metrics 时调用，只输出数值项"""
+        self._collectors.append((component, collect))
+
+    def observe_trace(self, trace: "RequestTrace"):
+        for span in trace.spans:
+            self.stage_seconds.observe(span['seconds'], span['name'])
+            for measure, value in span['sizes'].items():
+                self.stage_size.observe(value, span['name'], measure)
+        with self._lock:
+            self.requests += 1
+            if trace.error:
+                self.errors += 1
+
+    def render(self) -> str:
+        lines = self.stage_seconds.render() + self.stage_size.render()
+        with self._lock:
+            requests, errors = self.requests, self.errors
+        lines += [
+            "# HELP rag_requests_total Processed queries.",
+            "# TYPE rag_requests_total counter",
+            f"rag_requests_total {requests}",
+            "# HELP rag_request_errors_total Queries that ended with an error.",
+            "# TYPE rag_request_errors_total counter",
+            f"rag_request_errors_total {errors}",
+            "# HELP rag_component_stat Statistics reported by caches, the rerank scheduler and the deduplicator.",
+            "# TYPE rag_component_stat gauge",
+        ]
+        for component, collect in self._collectors:
+            try:
+                stats = collect() or {}
+            except Exception as e:
+                logger.warning(f"Error collecting {component} stats: {str(e)}")
+                continue
+            for stat, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                labels = _format_labels(("component", "stat"), (component, stat))
+                lines.append(f"rag_component_stat{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """
+    单个请求的阶段记录：每个 span 包含名称、耗时和数据量，
+    finish 时写入 MetricsRegistry 并输出一行结构化日志
+    """
+
+    def __init__(self, query: str, registry: Optional[MetricsRegistry] = None):
+        self.query = query
+        self.registry = registry
+        self.spans: List[Dict] = []
+        self.error: Optional[str] = None
+        self.started_at = time.perf_counter()
+        self._finished = False
+
+    def record(self, name: str, seconds: float, ended_at: Optional[float] = None, **sizes):
+        """
+        记录已经计时的阶段，例如搜索引擎返回的耗时
+
+        Args:
+            ended_at: 阶段结束的 time.perf_counter() 时间点，默认为当前时间
+        """
+        ended_at = time.perf_counter() if ended_at is None else ended_at
+        self.spans.append({
+            'name': name,
+            'start_ms': round((ended_at - self.started_at - seconds) * 1000, 1),
+            'seconds': seconds,
+            'sizes': {key: value for key, value in sizes.items() if value is not None}
+        })
+
+    @contextmanager
+    def span(self, name: str, **sizes) -> Iterator[Dict]:
+        """
+        计时一个阶段，产出的字典可以在阶段内补充数据量
+
+        with trace.span('rerank', candidates=n) as sizes:
+            ...
+            sizes['chunks'] = len(ranked)
+        """
+        start = time.perf_counter()
+        try:
+            yield sizes
+        finally:
+            self.record(name, time.perf_counter() - start, **sizes)
+
+    def finish(self, error: Optional[str] = None) -> Dict:
+        """结束请求，记录 total 阶段，只生效一次"""
+        if self._finished:
+            return self.to_dict()
+        self._finished = True
+        self.error = error
+        self.record('total', time.perf_counter() - self.started_at)
+        if self.registry is not None:
+            self.registry.observe_trace(self)
+        trace = self.to_dict()
+        if LogConfig.TRACE_LOGGING:
+            logger.info(f"trace {json.dumps(trace, ensure_ascii=False)}")
+        return trace
+
+    def to_dict(self) -> Dict:
+        return {
+            'query': self.query,
+            'error': self.error,
+            'spans': [
+                {
+                    'name': span['name'],
+                    'start_ms': span['start_ms'],
+                    'duration_ms': round(span['seconds'] * 1000, 1),
+                    **span['sizes']
+                } for span in self.spans
+            ]
+        }
+
+
+def record_fetch(trace: RequestTrace, windows: Sequence[Tuple[float, float]], results: int) -> None:
+    """
+    把一个请求中各批次的页面抓取记录为一个 fetch 阶段。
+    批次之间相互重叠，耗时取最早开始到最晚结束的墙钟时间
+    """
+    if not windows:
+        return
+    start = min(window[0] for window in windows)
+    end = max(window[1] for window in windows)
+    trace.record('fetch', end - start, ended_at=end, results=results, batches=len(windows))
+
+
+def record_processing(trace: RequestTrace, documents: Sequence) -> None:
+    """
+    把一个请求全部文档的清理和分块耗时记录为 clean / chunk 阶段，每个请求只调用一次。
+    并行处理时记录的是各文档耗时之和（工作线程/进程的 CPU 时间），而不是墙钟时间
+    """
+    clean = sum((doc.timings or {}).get('clean', 0.0) for doc in documents)
+    chunk = sum((doc.timings or {}).get('chunk', 0.0) for doc in documents)
+    trace.record('clean', clean, documents=len(documents))
+    trace.record('chunk', chunk, chunks=sum(len(doc.chunks) for doc in documents))
+
+
+class GenerationTracker:
+    """
+    记录 LLM 流式生成的首 token 时间（ttft）和总生成时间（generation），
+    token 数按内容事件计数，对 Ollama 和 OpenAI 流式接口都近似于一个事件一个 token
+    """
+
+    def __init__(self, trace: RequestTrace, llm_handler):
+        self.trace = trace
+        self.llm_handler = llm_handler
+        self.started_at = time.perf_counter()
+        self.tokens = 0
+        self.chars = 0
+
+    def observe(self, response: Dict) -> bool:
+        """处理一个生成事件，返回是否为首个 token"""
+        content = response.get('content')
+        if not isinstance(content, str) or not content:
+            return False
+        self.tokens += 1
+        self.chars += len(content)
+        if self.tokens == 1:
+            self.trace.record(
+                'ttft',
+                time.perf_counter() - self.started_at,
+                prompt_chars=self.llm_handler.prompt_chars,
+                prompt_tokens=self.llm_handler.prompt_tokens
+            )
+            return True
+        return False
+
+    def finish(self):
+        self.trace.record(
+            'generation',
+            time.perf_counter() - self.started_at,
+            prompt_chars=self.llm_handler.prompt_chars,
+            prompt_tokens=self.llm_handler.prompt_tokens,
+            tokens=self.tokens,
+            chars=self.chars
+        )
@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config.settings import OllamaConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCatalog:
+    """
+    Ollama 模型列表缓存：TTL 内直接返回缓存，过期后先返回旧列表并在后台刷新，
+    只有从未成功获取过列表时才同步请求 /api/tags
+    """
+
+    def __init__(self, client, ttl: Optional[float] = None):
+        self.client = client
+        self.ttl = OllamaConfig.MODELS_CACHE_TTL if ttl is None else ttl
+        self._models: Optional[List[Dict[str, str]]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _is_fresh(self) -> bool:
+        return self._models is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def refresh(self) -> List[Dict[str, str]]:
+        """同步刷新模型列表，失败时抛出异常"""
+        models = self.client.get_models()
+        with self._lock:
+            self._models = models
+            self._fetched_at = time.monotonic()
+        return models
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh of model list failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="model-catalog-refresh", daemon=True).start()
+
+    def get_models(self) -> List[Dict[str, str]]:
+        """获取模型列表，接口与 OllamaClient.get_models 一致"""
+        if self._is_fresh():
+            return list(self._models)
+        if self._models is None:
+            return list(self.refresh())
+        # 过期的列表仍然可用，刷新放到后台
+        self._refresh_in_background()
+        return list(self._models)
+
+    def invalidate(self):
+        """清空缓存，下次 get_models 时重新获取"""
+        with self._lock:
+            self._models = None
+            self._fetched_at = 0.0
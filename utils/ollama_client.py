@@ -1,7 +1,6 @@
-import requests
 import json
 import os
-from typing import Generator, Dict, List, Optional
+from typing import AsyncGenerator, Generator, Dict, List, Optional
 
 
 #添加上级目录到sys.path
@@ -9,17 +8,48 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.settings import OllamaConfig
+from utils.http_session import get_session
 
 class OllamaClient:
     def __init__(self, base_url=None):
         self.base_url = base_url or OllamaConfig.BASE_URL
         if self.base_url.endswith('/'):
             self.base_url = self.base_url[:-1]
+        self.session = get_session(
+            pool_connections=OllamaConfig.POOL_CONNECTIONS,
+            pool_maxsize=OllamaConfig.POOL_MAXSIZE,
+            max_retries=OllamaConfig.MAX_RETRIES,
+            backoff_factor=OllamaConfig.RETRY_BACKOFF
+        )
+        self.timeout = (OllamaConfig.CONNECT_TIMEOUT, OllamaConfig.TIMEOUT)
+
+    @staticmethod
+    def _options() -> Dict:
+        """OllamaConfig 中设置的推理参数，未设置的项交给 Ollama 使用默认值"""
+        options = {
+            'num_ctx': OllamaConfig.NUM_CTX,
+            'num_thread': OllamaConfig.NUM_THREAD,
+            'num_predict': OllamaConfig.NUM_PREDICT,
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+    def _payload(self, prompt: str, model: str, stream: bool) -> Dict:
+        """/api/generate 请求体，带上 keep_alive 避免模型在两次请求之间被卸载"""
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": OllamaConfig.KEEP_ALIVE
+        }
+        options = self._options()
+        if options:
+            payload["options"] = options
+        return payload
         
     def get_models(self) -> List[Dict[str, str]]:
         """获取所有可用的 Ollama 模型"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
             if response.ok:
                 data = response.json()
                 return [
@@ -34,14 +64,11 @@ class OllamaClient:
     def generate_stream(self, prompt: str, model: str) -> Generator[Dict, None, None]:
         """使用指定模型生成流式响应"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": True
-                },
-                stream=True
+                json=self._payload(prompt, model, stream=True),
+                stream=True,
+                timeout=self.timeout
             )
             
             if not response.ok:
@@ -50,19 +77,58 @@ class OllamaClient:
             # 首先yield一个空的sources列表
             yield {'type': 'sources', 'content': []}
             
-            # 处理流式响应
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        result = json.loads(line)
-                        if 'response' in result:
-                            yield {'type': 'content', 'content': result['response']}
-                    except json.JSONDecodeError:
-                        continue
+            # 处理流式响应，结束或中断时关闭响应以便连接归还连接池
+            try:
+                for line in response.iter_lines():
+                    if line:
+                        try:
+                            result = json.loads(line)
+                            if 'response' in result:
+                                yield {'type': 'content', 'content': result['response']}
+                        except json.JSONDecodeError:
+                            continue
+            finally:
+                response.close()
                         
         except Exception as e:
             raise Exception(f"Error in generate_stream: {str(e)}")
     
+    async def generate_stream_async(self, prompt: str, model: str, client) -> AsyncGenerator[Dict, None]:
+        """
+        异步流式生成，事件格式与 generate_stream 一致
+
+        Args:
+            prompt: 提示文本
+            model: 模型名称
+            client: httpx.AsyncClient
+        """
+        import httpx
+        try:
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/api/generate",
+                json=self._payload(prompt, model, stream=True),
+                timeout=httpx.Timeout(OllamaConfig.TIMEOUT, connect=OllamaConfig.CONNECT_TIMEOUT)
+            ) as response:
+                if response.is_error:
+                    body = await response.aread()
+                    raise Exception(f"Generation failed: {body.decode('utf-8', errors='replace')}")
+
+                # 首先yield一个空的sources列表
+                yield {'type': 'sources', 'content': []}
+
+                async for line in response.aiter_lines():
+                    if line:
+                        try:
+                            result = json.loads(line)
+                            if 'response' in result:
+                                yield {'type': 'content', 'content': result['response']}
+                        except json.JSONDecodeError:
+                            continue
+
+        except Exception as e:
+            raise Exception(f"Error in generate_stream_async: {str(e)}")
+    
     def generate(self, prompt: str, model: str) -> str:
         """使用指定模型生成非流式响应"""
         # 添加输入验证
@@ -73,13 +139,10 @@ class OllamaClient:
             raise ValueError("Model name cannot be empty")
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False
-                }
+                json=self._payload(prompt, model, stream=False),
+                timeout=self.timeout
             )
             if response.ok:
                 result = response.json()
@@ -90,10 +153,63 @@ class OllamaClient:
         except Exception as e:
             raise Exception(f"Error in generate: {str(e)}") 
         
+    async def generate_async(self, prompt: str, model: str, client) -> str:
+        """
+        异步非流式生成，与 generate 一致
+
+        Args:
+            prompt: 提示文本
+            model: 模型名称
+            client: httpx.AsyncClient
+        """
+        if not prompt or not prompt.strip():
+            raise ValueError("Prompt cannot be empty")
+
+        if not model or not model.strip():
+            raise ValueError("Model name cannot be empty")
+
+        import httpx
+        try:
+            response = await client.post(
+                f"{self.base_url}/api/generate",
+                json=self._payload(prompt, model, stream=False),
+                timeout=httpx.Timeout(OllamaConfig.TIMEOUT, connect=OllamaConfig.CONNECT_TIMEOUT)
+            )
+            if response.is_success:
+                return response.json().get('response', '')
+            else:
+                raise Exception(f"Generation failed: {response.text}")
+
+        except Exception as e:
+            raise Exception(f"Error in generate_async: {str(e)}")
+
+    def preload(self, model: Optional[str] = None) -> bool:
+        """
+        预先把模型加载到内存，避免第一个请求承担冷启动时间
+
+        Args:
+            model: 模型名称，默认 OllamaConfig.DEFAULT_MODEL
+        """
+        model = model or OllamaConfig.DEFAULT_MODEL
+        try:
+            # 不带 prompt 的 generate 请求只加载模型，不生成内容
+            payload = {"model": model, "keep_alive": OllamaConfig.KEEP_ALIVE}
+            options = self._options()
+            if options:
+                payload["options"] = options
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=(OllamaConfig.CONNECT_TIMEOUT, OllamaConfig.PRELOAD_TIMEOUT)
+            )
+            return response.ok
+        except Exception as e:
+            raise Exception(f"Error in preload: {str(e)}")
+
     def test_connection(self) -> bool:
         """测试与 Ollama 服务器的连接"""
         try:
-            response = requests.get(f"{self.base_url}/api/version")
+            response = self.session.get(f"{self.base_url}/api/version", timeout=self.timeout)
             return response.ok
         except Exception as e:
             raise Exception(f"Error in test_connection: {str(e)}")
@@ -0,0 +1,136 @@
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    url: str
+    clean_text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+class PageCache:
+    """
+    基于 sqlite（开启 mmap）的页面内容缓存，按规范化 URL 存储清理后的文本，
+    总大小超过上限时按最近访问时间淘汰。分块依赖查询词等请求参数，不缓存，由 DocumentProcessor 完成
+    """
+
+    def __init__(self, path: str, max_bytes: int, mmap_size: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: sqlite 文件路径
+            max_bytes: 缓存内容的总大小上限（字节）
+            mmap_size: sqlite 内存映射读取的大小（字节）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pages)")]
+            if "chunks" in columns:
+                # 旧版本同时缓存了分块结果，缓存内容可以丢弃，直接重建
+                logger.info(f"Dropping page cache table with cached chunks in {path}")
+                self._conn.execute("DROP TABLE pages")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, clean_text TEXT NOT NULL, "
+                "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+            self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT clean_text, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self.hits += 1
+        clean_text, etag, last_modified, fetched_at = row
+        return CachedPage(
+            url=url,
+            clean_text=clean_text,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at
+        )
+
+    def put(
+        self,
+        url: str,
+        clean_text: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        size = len(clean_text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            if old is not None:
+                self._total -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, clean_text, etag, last_modified, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, clean_text, etag, last_modified, now, now, size)
+            )
+            self._total += size
+            self._evict()
+
+    def mark_revalidated(self, url: str):
+        """服务器返回 304 时刷新抓取时间"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url)
+            )
+            self.revalidated += 1
+
+    def _evict(self):
+        """淘汰最久未访问的页面，直到总大小回到上限的 90% 以内，调用方需持有锁"""
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+        for url, size in rows:
+            if self._total <= target:
+                break
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'bytes': self._total,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,246 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from config.settings import FetchConfig
+from models.query import SearchResult
+from utils.deduplicator import canonicalize_url
+from utils.http_session import get_session
+from utils.page_cache import PageCache
+from utils.text_cleaner import TextCleaner
+
+logger = logging.getLogger(__name__)
+
+_CHARSET_RE = re.compile(rb'charset=["\']?([A-Za-z0-9_\-]+)', re.IGNORECASE)
+_READ_CHUNK = 16 * 1024
+
+
+@dataclass
+class FetchedPage:
+    text: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+
+
+class PageFetcher:
+    """
+    并发抓取搜索结果的完整页面：按主机限制并发、流式读取并在超过字节上限时提前中止、
+    按 Content-Type 过滤，并在全局截止时间后把未完成的页面回退为搜索摘要
+    """
+
+    def __init__(self, config: Optional[FetchConfig] = None, session: Optional[requests.Session] = None):
+        """
+        Args:
+            config: 抓取配置，默认 FetchConfig()
+            session: HTTP 会话，默认使用共享连接池（测试时可以传入指向本地桩服务的会话）
+        """
+        self.config = config or FetchConfig()
+        self.session = session or get_session(
+            pool_connections=self.config.MAX_WORKERS,
+            pool_maxsize=self.config.PER_HOST_LIMIT,
+            max_retries=0
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.config.MAX_WORKERS, thread_name_prefix="fetch")
+        self._host_limits: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+        self.page_cache = None
+        if self.config.PAGE_CACHE_ENABLED:
+            try:
+                self.page_cache = PageCache(self.config.PAGE_CACHE_PATH, self.config.PAGE_CACHE_MAX_BYTES)
+            except Exception as e:
+                logger.error(f"Failed to open page cache {self.config.PAGE_CACHE_PATH}: {str(e)}")
+        self.text_cleaner = TextCleaner()
+
+    def _host_limit(self, url: str) -> threading.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.config.PER_HOST_LIMIT)
+                self._host_limits[host] = semaphore
+            return semaphore
+
+    def fetch(
+        self,
+        url: str,
+        deadline_at: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Optional[FetchedPage]:
+        """
+        下载单个页面
+
+        Args:
+            url: 页面地址
+            deadline_at: time.monotonic() 时间点，超过后放弃
+            headers: 额外的请求头，如条件请求的 If-None-Match
+
+        Returns:
+            FetchedPage，服务器返回 304 时 not_modified 为 True；失败、类型不符或超时返回 None
+        """
+        semaphore = self._host_limit(url)
+        wait_time = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+        if not semaphore.acquire(timeout=wait_time):
+            return None
+        try:
+            timeout = (self.config.CONNECT_TIMEOUT, self.config.READ_TIMEOUT)
+            if deadline_at is not None:
+                # 连接和读取超时都不超过距截止时间的剩余时间，避免工作线程在截止后继续阻塞
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    return None
+                timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+            with self.session.get(
+                url,
+                stream=True,
+                timeout=timeout,
+                headers={"User-Agent": self.config.USER_AGENT, **(headers or {})}
+            ) as response:
+                if response.status_code == 304:
+                    return FetchedPage(text=None, not_modified=True)
+                if not response.ok:
+                    return None
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if content_type not in self.config.ALLOWED_CONTENT_TYPES:
+                    logger.debug(f"Skip {url}: content type {content_type or 'unknown'}")
+                    return None
+
+                body = bytearray()
+                for chunk in response.iter_content(_READ_CHUNK):
+                    body += chunk
+                    if len(body) >= self.config.MAX_BYTES:
+                        # 超过字节上限，保留已读取的部分并中止下载
+                        del body[self.config.MAX_BYTES:]
+                        break
+                    if deadline_at is not None and time.monotonic() > deadline_at:
+                        return None
+                return FetchedPage(
+                    text=self._decode(bytes(body), response),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+        except Exception as e:
+            logger.debug(f"Fetch {url} failed: {str(e)}")
+            return None
+        finally:
+            semaphore.release()
+
+    @staticmethod
+    def _decode(body: bytes, response: requests.Response) -> str:
+        """按响应头或页面 meta 中声明的编码解码，默认 UTF-8"""
+        encoding = None
+        if "charset" in response.headers.get("Content-Type", "").lower():
+            encoding = response.encoding
+        if not encoding:
+            match = _CHARSET_RE.search(body[:4096])
+            encoding = match.group(1).decode("ascii") if match else "utf-8"
+        try:
+            return body.decode(encoding, errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+
+    def load(self, url: str, deadline_at: Optional[float] = None) -> Optional[Tuple[str, Optional[float]]]:
+        """
+        获取页面内容，优先使用页面缓存
+
+        Returns:
+            (页面文本, 清理耗时)，启用缓存时页面文本已清理，清理耗时在缓存命中时为 0；
+            未启用缓存时返回原始页面和 None；无法获取时返回 None。
+            分块依赖请求的查询词，由 DocumentProcessor 完成
+        """
+        if self.page_cache is None:
+            page = self.fetch(url, deadline_at)
+            return (page.text, None) if page is not None and page.text else None
+
+        key = canonicalize_url(url)
+        cached = self.page_cache.get(key)
+        if cached is not None and cached.is_fresh(self.config.PAGE_CACHE_TTL):
+            return cached.clean_text, 0.0
+
+        # 缓存过期时发起条件请求重新验证
+        headers = {}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        page = self.fetch(url, deadline_at, headers)
+
+        if page is None or (page.not_modified and cached is None):
+            # 抓取失败时使用过期的缓存，好过回退为摘要
+            return (cached.clean_text, 0.0) if cached is not None else None
+        if page.not_modified:
+            self.page_cache.mark_revalidated(key)
+            return cached.clean_text, 0.0
+        if not page.text:
+            return None
+
+        # 缓存中保存清理后的文本，命中时跳过清理
+        start = time.perf_counter()
+        clean_text = self.text_cleaner.clean(page.text)
+        clean_seconds = time.perf_counter() - start
+        self.page_cache.put(key, clean_text, page.etag, page.last_modified)
+        return clean_text, clean_seconds
+
+    def fetch_results(
+        self,
+        results: List[SearchResult],
+        deadline: Optional[float] = None,
+        deadline_at: Optional[float] = None
+    ) -> List[SearchResult]:
+        """
+        抓取搜索结果的完整页面，返回内容替换为页面文本的新结果列表
+
+        Args:
+            results: 搜索结果
+            deadline: 截止时间（秒），从调用时开始计算，默认 FetchConfig.DEADLINE
+            deadline_at: time.monotonic() 时间点，优先于 deadline，多个批次共享同一个截止时间时使用
+
+        Returns:
+            与输入顺序一致的结果，未能在截止时间内抓取的页面保留原摘要
+        """
+        if not results:
+            return []
+        start = time.monotonic()
+        if deadline_at is None:
+            deadline_at = start + (self.config.DEADLINE if deadline is None else deadline)
+        deadline = max(0.0, deadline_at - start)
+
+        futures = {}
+        for result in results:
+            key = canonicalize_url(result.url)
+            if key and key not in futures:
+                futures[key] = self.executor.submit(self.load, result.url, deadline_at)
+        done, not_done = wait(list(futures.values()), timeout=deadline)
+        for future in not_done:
+            future.cancel()
+
+        fetched = []
+        pages = 0
+        for result in results:
+            future = futures.get(canonicalize_url(result.url))
+            page = future.result() if future is not None and future in done else None
+            if page:
+                pages += 1
+                content, clean_seconds = page
+                fetched.append(SearchResult(
+                    title=result.title,
+                    content=content,
+                    url=result.url,
+                    score=result.score,
+                    clean_seconds=clean_seconds
+                ))
+            else:
+                fetched.append(result)
+
+        logger.info(
+            f"Fetched {pages}/{len(results)} pages in {(time.monotonic() - start) * 1000:.0f} ms "
+            f"({len(not_done)} missed the deadline)"
+        )
+        return fetched
@@ -0,0 +1,79 @@
+import re
+from typing import Optional
+
+from config.settings import ProcessingConfig
+from utils.cache import normalize_query
+
+# 路由结果
+ROUTE_DIRECT = "direct"  # 不搜索，直接由 LLM 回答
+ROUTE_NO_REWRITE = "no_rewrite"  # 使用原始查询搜索，不调用 LLM 改写
+ROUTE_REWRITE = "rewrite_only"  # 只做语义改写
+ROUTE_EXPAND = "full_expansion"  # 语义改写 + 语义扩展
+
+# 寒暄、致谢等不需要检索的输入
+_DIRECT_RE = re.compile(
+    r'^(你好|您好|嗨|哈喽|早上好|晚上好|谢谢|多谢|感谢|再见|拜拜|你是谁|'
+    r'hi|hello|hey|thanks|thank you|bye|goodbye|who are you)[\s!！.。?？~]*$'
+)
+# 纯算术表达式：至少两个操作数之间有运算符，单独的数字（年份、状态码、车次等）仍然检索
+_NUMBER = r'[\s(]*\d+(?:\.\d+)?[\s)]*'
+_ARITHMETIC_RE = re.compile(rf'^{_NUMBER}(?:[+\-*/×÷^]{_NUMBER})+(?P<ask>=?\s*[?？]?)\s*$')
+_NON_MINUS_OPERATOR_RE = re.compile(r'[+*/×÷^]')
+# 比较、多方面或开放式问题，适合做语义扩展
+_EXPAND_RE = re.compile(
+    r'区别|比较|对比|优缺点|优劣|利弊|哪个好|为什么|如何|怎么|怎样|'
+    r'\bvs\.?\b|\bversus\b|\bcompare\b|\bdifference\b|\bpros and cons\b|\bhow\b|\bwhy\b'
+)
+# 疑问句标记，带有这些标记的短查询仍然做改写
+_QUESTION_RE = re.compile(r'[?？]|吗|呢|什么|哪|\bwhat\b|\bwhich\b|\bwho\b|\bwhen\b|\bwhere\b')
+_CJK_RE = re.compile(r'[一-鿿]')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+class QueryRouter:
+    """
+    基于规则的轻量查询路由，在调用 LLM 改写之前判断是否需要改写、扩展或检索
+    """
+
+    def __init__(self, config: Optional[ProcessingConfig] = None):
+        self.config = config or ProcessingConfig()
+
+    @staticmethod
+    def count_terms(text: str) -> int:
+        """统计查询的词数：中文按字计数，其他按单词计数"""
+        return len(_CJK_RE.findall(text)) + len(_WORD_RE.findall(text))
+
+    @staticmethod
+    def _is_arithmetic(text: str) -> bool:
+        """
+        判断是否为算术表达式；只含减号的（如 2024-01-01、010-12345678）可能是日期或电话，
+        需要以 = 或问号结尾才算
+        """
+        match = _ARITHMETIC_RE.match(text)
+        if match is None:
+            return False
+        return bool(_NON_MINUS_OPERATOR_RE.search(text) or match.group('ask').strip())
+
+    def route(self, query: str) -> str:
+        """
+        判断查询的处理路径
+
+        Args:
+            query: 原始查询
+
+        Returns:
+            ROUTE_DIRECT / ROUTE_NO_REWRITE / ROUTE_REWRITE / ROUTE_EXPAND 之一
+        """
+        text = normalize_query(query)
+        if not text:
+            return ROUTE_NO_REWRITE
+
+        if self.config.ROUTE_ALLOW_DIRECT_ANSWER and (_DIRECT_RE.match(text) or self._is_arithmetic(text)):
+            return ROUTE_DIRECT
+
+        terms = self.count_terms(text)
+        if terms >= self.config.ROUTE_EXPAND_MIN_TERMS or _EXPAND_RE.search(text):
+            return ROUTE_EXPAND
+        if terms <= self.config.ROUTE_NO_REWRITE_MAX_TERMS and not _QUESTION_RE.search(text):
+            return ROUTE_NO_REWRITE
+        return ROUTE_REWRITE
@@ -0,0 +1,116 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Request:
+    __slots__ = ("pairs", "future")
+
+    def __init__(self, pairs: Sequence[Tuple[str, str]]):
+        self.pairs = pairs
+        self.future: Future = Future()
+
+
+class MicroBatchScheduler:
+    """
+    跨请求的微批调度器：把并发请求提交的 (query, text) 对合并成一个批次推理，
+    按批次大小或时间窗口触发，再把分数按请求切分返回
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Tuple[str, str]]], List[float]],
+        max_batch_size: int = 256,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Args:
+            predict_fn: 实际的批量推理函数，输入输出顺序一致
+            max_batch_size: 单批次最多合并的样本数
+            max_wait_ms: 收到第一个请求后最多等待其他请求的时间（毫秒）
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_pairs = 0
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.pairs_scored = 0
+        self._worker = threading.Thread(target=self._run, name="rerank-scheduler", daemon=True)
+        self._worker.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """当前排队等待推理的样本数"""
+        return self._pending_pairs
+
+    def submit(self, pairs: Sequence[Tuple[str, str]]) -> Future:
+        """提交一组样本，返回结果为分数列表的 Future"""
+        request = _Request(pairs)
+        if not pairs:
+            request.future.set_result([])
+            return request.future
+        with self._lock:
+            self._pending_pairs += len(pairs)
+            self.max_queue_depth = max(self.max_queue_depth, self._pending_pairs)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """同步接口，阻塞直到本组样本的分数返回"""
+        return self.submit(pairs).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queue_depth': self._pending_pairs,
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'pairs_scored': self.pairs_scored,
+                'avg_batch_size': self.pairs_scored / self.batches if self.batches else 0.0
+            }
+
+    def _collect(self) -> List[_Request]:
+        """阻塞等待第一个请求，然后在时间窗口内尽量凑满一个批次"""
+        batch = [self._queue.get()]
+        size = len(batch[0].pairs)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.pairs)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            pairs = [pair for request in batch for pair in request.pairs]
+            with self._lock:
+                self._pending_pairs -= len(pairs)
+            try:
+                scores = self.predict_fn(pairs)
+                offset = 0
+                for request in batch:
+                    request.future.set_result(scores[offset:offset + len(request.pairs)])
+                    offset += len(request.pairs)
+                with self._lock:
+                    self.batches += 1
+                    self.pairs_scored += len(pairs)
+                logger.debug(f"Reranked micro-batch of {len(pairs)} pairs from {len(batch)} requests")
+            except Exception as e:
+                logger.error(f"Micro-batch rerank failed: {str(e)}")
+                for request in batch:
+                    request.future.set_exception(e)
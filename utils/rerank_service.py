@@ -0,0 +1,140 @@
+from typing import List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+from config.settings import ModelConfig
+from utils.cache import TTLCache, make_cache_key
+from utils.rerank_scheduler import MicroBatchScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class RerankService:
+    """
+    交叉编码器重排序服务：按长度排序分批推理，并缓存 (query, chunk) 的分数
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_length: Optional[int] = None,
+        device: Optional[str] = None,
+        num_threads: Optional[int] = None,
+        cache_size: Optional[int] = None
+    ):
+        """
+        Args:
+            model_name: 交叉编码器模型，默认 ModelConfig.RERANKER_MODEL
+            batch_size: 每批推理的样本数
+            max_length: 输入的最大 token 长度，超出部分截断
+            device: 推理设备（如 "cpu"、"cuda"），None 表示自动选择
+            num_threads: CPU 推理线程数，None 表示使用 torch 默认值
+            cache_size: 分数缓存的最大条目数，0 表示不缓存
+        """
+        self.model_name = model_name or ModelConfig.RERANKER_MODEL
+        self.batch_size = batch_size or ModelConfig.RERANKER_BATCH_SIZE
+        self.max_length = max_length or ModelConfig.RERANKER_MAX_LENGTH
+        self.device = device or ModelConfig.RERANKER_DEVICE
+        self.num_threads = num_threads or ModelConfig.RERANKER_NUM_THREADS
+        cache_size = ModelConfig.RERANK_CACHE_SIZE if cache_size is None else cache_size
+
+        # 模型在首次使用或调用 load() 时加载，避免 import 和构造阶段加载 torch
+        self._model = None
+        self._load_lock = threading.Lock()
+        self.cache = TTLCache(max_entries=cache_size, ttl=None, namespace="rerank") if cache_size else None
+        # 所有请求共用一个模型实例，由调度器把并发请求合并成大批次
+        self.scheduler = MicroBatchScheduler(
+            self.predict,
+            max_batch_size=ModelConfig.RERANK_MAX_BATCH_PAIRS,
+            max_wait_ms=ModelConfig.RERANK_BATCH_WINDOW_MS
+        ) if ModelConfig.RERANK_MICRO_BATCHING else None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self.load()
+        return self._model
+
+    def load(self):
+        """加载交叉编码器，可在启动时于后台线程中调用"""
+        with self._load_lock:
+            if self._model is not None:
+                return
+            start = time.perf_counter()
+            if self.num_threads:
+                import torch
+                torch.set_num_threads(self.num_threads)
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+            logger.info(f"Loaded reranker {self.model_name} in {time.perf_counter() - start:.1f}s")
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        """
+        计算查询与每个文本块的相关度分数，已缓存的分数不再重复计算
+
+        Args:
+            query: 查询文本
+            texts: 文本块列表
+
+        Returns:
+            与 texts 顺序一致的分数列表
+        """
+        scores: List[Optional[float]] = [None] * len(texts)
+        keys = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(texts):
+            if self.cache is not None:
+                keys[i] = make_cache_key(query, text)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    scores[i] = cached
+                    continue
+            missing.append(i)
+
+        if missing:
+            logger.debug(f"Rerank cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+            pairs = [(query, texts[i]) for i in missing]
+            computed = self.scheduler.predict(pairs) if self.scheduler is not None else self.predict(pairs)
+            for i, value in zip(missing, computed):
+                scores[i] = value
+                if self.cache is not None:
+                    self.cache.set(keys[i], value)
+
+        return scores
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """
+        对 (query, text) 对进行推理，按长度排序后分批以减少 padding 浪费
+
+        Returns:
+            与 pairs 顺序一致的分数列表
+        """
+        if not pairs:
+            return []
+
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        scores = [0.0] * len(pairs)
+        for start in range(0, len(order), self.batch_size):
+            batch_idx = order[start:start + self.batch_size]
+            batch_scores = self.model.predict(
+                [list(pairs[i]) for i in batch_idx],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            for i, value in zip(batch_idx, batch_scores):
+                scores[i] = float(value)
+        return scores
+
+    def cache_stats(self) -> dict:
+        """返回分数缓存的命中统计"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def scheduler_stats(self) -> dict:
+        """返回微批调度器的队列深度与批次统计"""
+        return self.scheduler.stats() if self.scheduler is not None else {}
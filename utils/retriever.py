@@ -0,0 +1,136 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import List, Optional, Sequence
+import logging
+
+from config.settings import ModelConfig, ProcessingConfig
+
+logger = logging.getLogger(__name__)
+
+_LATIN_RE = re.compile(r'[a-z0-9]+')
+_CJK_RUN_RE = re.compile(r'[一-鿿]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    轻量分词：英文按单词，中文按单字 + 相邻二元组
+    """
+    text = text.lower()
+    tokens = _LATIN_RE.findall(text)
+    for run in _CJK_RUN_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Retriever:
+    """对候选文本块即时计算 BM25 分数，无需预建索引"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        docs = [Counter(tokenize(text)) for text in texts]
+        if not docs:
+            return []
+        lengths = [sum(doc.values()) for doc in docs]
+        avg_len = (sum(lengths) / len(lengths)) or 1.0
+
+        n = len(docs)
+        query_terms = set(tokenize(query))
+        idf = {}
+        for term in query_terms:
+            df = sum(1 for doc in docs if term in doc)
+            idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        scores = []
+        for doc, length in zip(docs, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_len)
+            score = 0.0
+            for term in query_terms:
+                tf = doc.get(term)
+                if tf:
+                    score += idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+
+class EmbeddingRetriever:
+    """使用 ModelConfig.EMBEDDING_MODEL 计算余弦相似度，模型在首次使用时加载"""
+
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or ModelConfig.EMBEDDING_MODEL
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        if not texts:
+            return []
+        embeddings = self.model.encode(
+            [query] + list(texts),
+            batch_size=ModelConfig.RERANKER_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        # 向量已归一化，点积即余弦相似度
+        return (embeddings[1:] @ embeddings[0]).tolist()
+
+
+class Prefilter:
+    """
+    交叉编码器之前的粗排阶段，把候选块裁剪到 top_n 个
+
+    method 可选 "bm25"、"embedding" 或 "hybrid"（两者按 RRF 融合）
+    """
+
+    RRF_K = 60
+
+    def __init__(self, method: Optional[str] = None, top_n: Optional[int] = None):
+        self.method = method or ProcessingConfig.PREFILTER_METHOD
+        self.top_n = top_n or ProcessingConfig.PREFILTER_TOP_N
+        if self.method not in ("bm25", "embedding", "hybrid"):
+            raise ValueError(f"Unsupported prefilter method: {self.method}")
+        self.bm25 = BM25Retriever()
+        self.embedding = EmbeddingRetriever() if self.method != "bm25" else None
+
+    def select(self, query: str, texts: Sequence[str]) -> List[int]:
+        """
+        返回保留的候选下标（按原顺序），候选数不超过 top_n 时全部保留
+        """
+        if len(texts) <= self.top_n:
+            return list(range(len(texts)))
+
+        if self.method == "bm25":
+            scores = self.bm25.score(query, texts)
+        elif self.method == "embedding":
+            scores = self.embedding.score(query, texts)
+        else:
+            scores = self._rrf([
+                self.bm25.score(query, texts),
+                self.embedding.score(query, texts)
+            ])
+
+        top = sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)[:self.top_n]
+        return sorted(top)
+
+    def _rrf(self, score_lists: List[List[float]]) -> List[float]:
+        """Reciprocal Rank Fusion：按各路排名融合分数"""
+        fused = [0.0] * len(score_lists[0])
+        for scores in score_lists:
+            ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+            for rank, i in enumerate(ranked):
+                fused[i] += 1.0 / (self.RRF_K + rank + 1)
+        return fused
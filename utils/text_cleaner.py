@@ -1,13 +1,79 @@
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from typing import List
 import re
 
+try:
+    from lxml import etree as lxml_etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml 为可选依赖，缺失时使用标准库的流式解析器
+    lxml_etree = None
+    lxml_html = None
+
+# 标签或 HTML 实体，没有命中时跳过 HTML 解析
+_MARKUP_RE = re.compile(r'<[a-zA-Z/!?]|&(?:[a-zA-Z][a-zA-Z0-9]*|#[0-9]+|#[xX][0-9a-fA-F]+);')
+_WHITESPACE_RE = re.compile(r'\s+')
+# 保留中文句读，分块器依赖 。！？ 作为分隔符
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,!?\-。！？，、；：]')
+_SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+
+class _StreamingTextExtractor(HTMLParser):
+    """基于标准库的流式 HTML 文本提取器，跳过脚本和样式内容"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
 class TextCleaner:
+    @staticmethod
+    def has_markup(text: str) -> bool:
+        """判断文本中是否包含 HTML 标签或实体"""
+        return _MARKUP_RE.search(text) is not None
+
+    @staticmethod
+    def extract_text(html: str) -> str:
+        """从 HTML 中提取纯文本，优先使用 lxml，缺失时使用流式解析器"""
+        if lxml_html is not None:
+            try:
+                root = lxml_html.fromstring(html)
+                lxml_etree.strip_elements(root, *_SKIP_TAGS, with_tail=False)
+                return root.text_content()
+            except (lxml_etree.ParserError, ValueError):
+                pass
+        extractor = _StreamingTextExtractor()
+        extractor.feed(html)
+        extractor.close()
+        return "".join(extractor.parts)
+
     @staticmethod
     def clean(text: str) -> str:
-        # 移除HTML标签
-        text = BeautifulSoup(text, "html.parser").get_text()
+        if not text:
+            return ""
+        # 移除HTML标签，大部分搜索摘要不含标签，直接跳过解析
+        if TextCleaner.has_markup(text):
+            text = TextCleaner.extract_text(text)
         # 移除多余空白
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
         # 移除特殊字符
-        text = re.sub(r'[^\w\s.,!?-]', '', text)
-        return text 
\ No newline at end of file
+        text = _SPECIAL_CHARS_RE.sub('', text)
+        return text
+
+    @staticmethod
+    def clean_batch(texts: List[str]) -> List[str]:
+        """批量清理文本"""
+        clean = TextCleaner.clean
+        return [clean(text) for text in texts]
@@ -0,0 +1,111 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# 与 ChunkManager 原先传给 LangChain 的分隔符保持一致，按优先级排列
+DEFAULT_SEPARATORS = ["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]
+
+Span = Tuple[int, int]
+
+
+class RecursiveTextSplitter:
+    """
+    递归字符分块器，行为与 LangChain RecursiveCharacterTextSplitter
+    （keep_separator=True、strip_whitespace=True）一致，但只在原文上操作偏移量，
+    以生成器方式产出 (start, end)，调用方可以随时停止
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: Optional[Sequence[str]] = None
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators or DEFAULT_SEPARATORS)
+
+    def iter_spans(self, text: str) -> Iterator[Span]:
+        """按顺序产出每个块在原文中的 (start, end)，块文本即 text[start:end]"""
+        if not text:
+            return iter(())
+        return self._split(text, 0, len(text), self.separators)
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.iter_spans(text)]
+
+    def _split(self, text: str, start: int, end: int, separators: Sequence[str]) -> Iterator[Span]:
+        # 选择区间内出现的第一个分隔符，剩余的分隔符用于继续拆分过长的片段
+        separator = separators[-1]
+        remaining: Sequence[str] = []
+        for i, sep in enumerate(separators):
+            if sep == "":
+                separator = sep
+                break
+            if text.find(sep, start, end) != -1:
+                separator = sep
+                remaining = separators[i + 1:]
+                break
+
+        good: List[Span] = []
+        for piece in self._pieces(text, start, end, separator):
+            if piece[1] - piece[0] < self.chunk_size:
+                good.append(piece)
+                continue
+            if good:
+                yield from self._merge(text, good)
+                good = []
+            if remaining:
+                yield from self._split(text, piece[0], piece[1], remaining)
+            else:
+                yield piece
+        if good:
+            yield from self._merge(text, good)
+
+    @staticmethod
+    def _pieces(text: str, start: int, end: int, separator: str) -> List[Span]:
+        """按分隔符切分区间，分隔符保留在下一个片段的开头"""
+        if separator == "":
+            return [(i, i + 1) for i in range(start, end)]
+        pieces = []
+        piece_start = start
+        pos = text.find(separator, start, end)
+        while pos != -1:
+            if pos > piece_start:
+                pieces.append((piece_start, pos))
+            piece_start = pos
+            pos = text.find(separator, pos + len(separator), end)
+        if end > piece_start:
+            pieces.append((piece_start, end))
+        return pieces
+
+    def _merge(self, text: str, pieces: List[Span]) -> Iterator[Span]:
+        """把相邻的小片段合并到 chunk_size 以内，并保留 chunk_overlap 的重叠"""
+        current: List[Span] = []
+        head = 0  # current[head:] 是当前窗口，避免反复切片
+        total = 0
+        for piece in pieces:
+            length = piece[1] - piece[0]
+            if total + length > self.chunk_size and head < len(current):
+                span = self._strip(text, current[head][0], current[-1][1])
+                if span is not None:
+                    yield span
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    total -= current[head][1] - current[head][0]
+                    head += 1
+            current.append(piece)
+            total += length
+        if head < len(current):
+            span = self._strip(text, current[head][0], current[-1][1])
+            if span is not None:
+                yield span
+
+    @staticmethod
+    def _strip(text: str, start: int, end: int) -> Optional[Span]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end) if end > start else None
@@ -1,4 +1,10 @@
+import time
+
+# 启动耗时从模块导入开始计算
+_import_started = time.perf_counter()
+
 from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+import logging
 import sys
 import os
 import json
@@ -8,21 +14,39 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from main import RAGSearch
-from utils.ollama_client import OllamaClient
 
 app = Flask(__name__)
 rag_search = RAGSearch()
-ollama_client = OllamaClient()
+# 模型在后台加载，服务启动后即可响应 /，就绪状态通过 /ready 查询
+rag_search.warm_up(background=True)
+startup_seconds = time.perf_counter() - _import_started
+logging.getLogger(__name__).info(f"Web app started in {startup_seconds:.2f}s")
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """就绪探针：模型加载和客户端预热完成前，或模型加载失败时返回 503，error 为失败原因"""
+    is_ready = rag_search.is_ready()
+    return jsonify({
+        'ready': is_ready,
+        'startup_seconds': round(startup_seconds, 3),
+        'warmup_seconds': None if rag_search.warmup_seconds is None else round(rag_search.warmup_seconds, 3),
+        'error': rag_search.warmup_error
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 文本格式的阶段耗时直方图和组件统计"""
+    return Response(rag_search.metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/models', methods=['GET'])
 def get_models():
     try:
-        # 获取 Ollama 模型列表并添加 GPT-4
-        ollama_models = ollama_client.get_models()
+        # 获取缓存的 Ollama 模型列表并添加 GPT-4
+        ollama_models = rag_search.model_catalog.get_models()
         all_models = [{'name': 'gpt', 'display_name': 'GPT'}] + ollama_models
         
         return jsonify({
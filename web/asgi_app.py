@@ -0,0 +1,122 @@
+"""
+ASGI 服务模式：与 web/app.py 提供相同的 /、/models 和 /search 接口，
+使用异步流水线，单个进程可以同时保持大量 SSE 连接
+
+启动：uvicorn web.asgi_app:app --host 0.0.0.0 --port 5000
+或：python web/asgi_app.py
+"""
+import time
+
+# 启动耗时从模块导入开始计算
+_import_started = time.perf_counter()
+
+from quart import Quart, render_template, request, jsonify, Response
+import asyncio
+import logging
+import sys
+import os
+import json
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from main import RAGSearch
+from core.async_pipeline import AsyncRAGSearch
+from config.settings import ServerConfig
+
+app = Quart(__name__)
+# SSE 流持续整个生成过程，不设置响应超时
+app.config['RESPONSE_TIMEOUT'] = None
+rag_search = RAGSearch()
+# 模型在后台加载，服务启动后即可响应 /，就绪状态通过 /ready 查询
+rag_search.warm_up(background=True)
+async_rag_search = AsyncRAGSearch(rag_search)
+startup_seconds = time.perf_counter() - _import_started
+logging.getLogger(__name__).info(f"ASGI app started in {startup_seconds:.2f}s")
+
+@app.route('/')
+async def home():
+    return await render_template('index.html')
+
+@app.route('/ready', methods=['GET'])
+async def ready():
+    """就绪探针：模型加载和客户端预热完成前，或模型加载失败时返回 503，error 为失败原因"""
+    is_ready = rag_search.is_ready()
+    return jsonify({
+        'ready': is_ready,
+        'startup_seconds': round(startup_seconds, 3),
+        'warmup_seconds': None if rag_search.warmup_seconds is None else round(rag_search.warmup_seconds, 3),
+        'error': rag_search.warmup_error
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus 文本格式的阶段耗时直方图和组件统计"""
+    return Response(rag_search.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/models', methods=['GET'])
+async def get_models():
+    try:
+        # 获取缓存的 Ollama 模型列表并添加 GPT-4
+        loop = asyncio.get_running_loop()
+        ollama_models = await loop.run_in_executor(async_rag_search.executor, rag_search.model_catalog.get_models)
+        all_models = [{'name': 'gpt', 'display_name': 'GPT'}] + ollama_models
+        
+        return jsonify({
+            'success': True,
+            'models': all_models
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error fetching models: {str(e)}'
+        })
+
+@app.route('/search', methods=['POST'])
+async def search():
+    try:
+        data = await request.get_json()
+        query = data.get('query', '').strip()
+        model = data.get('model', 'gpt')
+        
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': '请输入有效的问题'
+            })
+
+        async def generate():
+            try:
+                llm_type = "gpt" if model == "gpt" else "ollama"
+                async for response in async_rag_search.process_query_stream(query, llm_type=llm_type, model_name=model):
+                    if 'sources' in response:
+                        # 确保返回完整的来源信息
+                        sources = [{
+                            'url': source['url'],
+                            'title': source['title'],
+                            'score': source['score']
+                        } for source in response['sources']]
+                        yield f"data: {json.dumps({'sources': sources})}\n\n"
+                    else:
+                        yield f"data: {json.dumps(response)}\n\n"
+            except Exception as e:
+                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+
+        response = Response(generate(), mimetype='text/event-stream')
+        response.timeout = None
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'处理查询时发生错误: {str(e)}'
+        })
+
+@app.after_serving
+async def shutdown():
+    await async_rag_search.aclose()
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host=ServerConfig.HOST, port=ServerConfig.PORT)